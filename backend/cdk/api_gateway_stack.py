@@ -1,7 +1,7 @@
 """
 CDK Stack for API Gateway + Lambda Runtime Proxy
 Enables React app to call AgentCore Runtime with full MCP tools support
-Uses VPC endpoint for bedrock-agentcore-runtime (no NAT Gateway needed)
+Lambda runs outside a VPC and calls AgentCore over its public endpoint
 """
 from aws_cdk import (
     Stack,
@@ -9,28 +9,30 @@ from aws_cdk import (
     CfnOutput,
     BundlingOptions,
     aws_lambda as lambda_,
-    aws_apigateway as apigw,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_integrations as integrations,
     aws_iam as iam,
     aws_ssm as ssm,
-    aws_ec2 as ec2,
+    aws_logs as logs,
+    RemovalPolicy,
 )
 from constructs import Construct
+import json
 import os
 
+# HTTP API integrations are capped at 29s; the proxy Lambda gets the same
+# budget so it never keeps running after the client has received a 503
+API_TIMEOUT = Duration.seconds(29)
+
 
 class ApiGatewayStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
 
-        # Get configuration from CloudFormation exports (set by HertzMcpStack)
-        from aws_cdk import Fn
-        cognito_user_pool_id = Fn.import_value("HertzCognitoUserPoolId")
-        cognito_client_id = Fn.import_value("HertzCognitoClientId")
-        
-        # Runtime ARN will be set after runtime deployment, use SSM for this
-        runtime_arn = ssm.StringParameter.value_from_lookup(
-            self, "/hertz/agentcore/strands_runtime_arn"
-        )
+        # Runtime ARN is written to SSM by deploy_agentcore_runtime.py after this
+        # stack is deployed, so the Lambda resolves it at runtime (cached)
+        # instead of baking a possibly stale synth-time lookup into the template
+        runtime_arn_parameter = "/hertz/agentcore/strands_runtime_arn"
 
         # Lambda execution role
         lambda_role = iam.Role(
@@ -45,21 +47,18 @@ class ApiGatewayStack(Stack):
                 iam.ManagedPolicy.from_aws_managed_policy_name(
                     "AmazonDynamoDBReadOnlyAccess"
                 ),
-                iam.ManagedPolicy.from_aws_managed_policy_name(
-                    "AmazonSSMReadOnlyAccess"
-                ),
             ],
         )
 
-        # Add permissions for Cognito and AgentCore
+        # Add permissions for SSM and AgentCore (the runtime is invoked with
+        # the role's IAM credentials, no Cognito token is involved)
         lambda_role.add_to_policy(
             iam.PolicyStatement(
                 effect=iam.Effect.ALLOW,
-                actions=[
-                    "cognito-idp:AdminInitiateAuth",
-                    "cognito-idp:DescribeUserPoolClient",
+                actions=["ssm:GetParameter"],
+                resources=[
+                    f"arn:aws:ssm:{self.region}:{self.account}:parameter{runtime_arn_parameter}"
                 ],
-                resources=[f"arn:aws:cognito-idp:{self.region}:{self.account}:userpool/*"],
             )
         )
 
@@ -76,100 +75,140 @@ class ApiGatewayStack(Stack):
             )
         )
 
-        # Add VPC permissions for Lambda
-        lambda_role.add_managed_policy(
-            iam.ManagedPolicy.from_aws_managed_policy_name(
-                "service-role/AWSLambdaVPCAccessExecutionRole"
-            )
-        )
-
-        # Create VPC for Lambda with NAT Gateway for internet access
-        vpc = ec2.Vpc(
+        # Log group owned by the stack so the cold-start metric filter can
+        # attach to it before the first invocation
+        proxy_log_group = logs.LogGroup(
             self,
-            "LambdaVpc",
-            max_azs=2,
-            nat_gateways=1,  # NAT Gateway for Lambda to access AgentCore Runtime
-            subnet_configuration=[
-                ec2.SubnetConfiguration(
-                    name="Public",
-                    subnet_type=ec2.SubnetType.PUBLIC,
-                    cidr_mask=24
-                ),
-                ec2.SubnetConfiguration(
-                    name="Private",
-                    subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS,
-                    cidr_mask=24
-                )
-            ]
+            "RuntimeProxyLogs",
+            retention=logs.RetentionDays.ONE_MONTH,
+            removal_policy=RemovalPolicy.DESTROY,
         )
 
-        # Security group for Lambda
-        lambda_sg = ec2.SecurityGroup(
-            self,
-            "LambdaSecurityGroup",
-            vpc=vpc,
-            description="Security group for Lambda runtime proxy",
-            allow_all_outbound=True
-        )
-
-        # Lambda function with VPC configuration
+        # Lambda function (no VPC: AgentCore and SSM are reached over
+        # their public endpoints with TLS + SigV4, avoiding ENI cold-start cost)
         runtime_proxy_lambda = lambda_.Function(
             self,
             "RuntimeProxyFunction",
             function_name="hertz-runtime-proxy",
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             handler="runtime_proxy_lambda.lambda_handler",
             code=lambda_.Code.from_asset(
                 "../lambda",
+                # Bundling mounts the whole directory, so this only keeps tool changes
+                # out of the asset hash; the command below copies just the proxy handler
+                exclude=["shared", "weather_lambda.py", "flight_lambda.py", "*.json"],
                 bundling=BundlingOptions(
                     image=lambda_.Runtime.PYTHON_3_12.bundling_image,
                     command=[
                         "bash", "-c",
-                        "pip install -r requirements.txt -t /asset-output && cp -au . /asset-output"
+                        "pip install --platform manylinux2014_aarch64 --implementation cp "
+                        "--python-version 3.12 --abi cp312 --only-binary=:all: "
+                        "--no-compile -r requirements.txt -t /asset-output && "
+                        "cp -a runtime_proxy_lambda.py /asset-output/ && "
+                        # Prune stale bytecode caches and bundled test suites to shrink the zip
+                        "find /asset-output -depth \\( -name '__pycache__' -o -name 'tests' \\) "
+                        "-type d -exec rm -rf {} + && "
+                        # then precompile once; /var/task is read-only so INIT could never
+                        # cache its own .pyc, and unchecked-hash skips the mtime check
+                        "python -m compileall -q --invalidation-mode unchecked-hash /asset-output"
                     ],
                 )
             ),
             role=lambda_role,
-            timeout=Duration.seconds(60),
-            memory_size=512,
-            vpc=vpc,
-            vpc_subnets=ec2.SubnetSelection(subnet_type=ec2.SubnetType.PRIVATE_WITH_EGRESS),
-            security_groups=[lambda_sg],
+            timeout=API_TIMEOUT,
+            memory_size=1769,  # one full vCPU
+            reserved_concurrent_executions=50,  # cap bursts toward SSM and the runtime
+            tracing=lambda_.Tracing.ACTIVE,
+            log_group=proxy_log_group,
+            snap_start=lambda_.SnapStartConf.ON_PUBLISHED_VERSIONS,
             environment={
-                "COGNITO_USER_POOL_ID": cognito_user_pool_id,
-                "COGNITO_CLIENT_ID": cognito_client_id,
-                "COGNITO_TEST_USERNAME": os.getenv("COGNITO_TEST_USERNAME", "test-user"),
-                "COGNITO_TEST_PASSWORD": os.getenv("COGNITO_TEST_PASSWORD", "TestPass123!"),
-                "STRANDS_RUNTIME_ARN": runtime_arn,
-                "TICKETMASTER_API_KEY": os.getenv("TICKETMASTER_API_KEY", ""),
-                "AVIATIONSTACK_API_KEY": os.getenv("AVIATIONSTACK_API_KEY", ""),
+                "STRANDS_RUNTIME_ARN_PARAMETER": runtime_arn_parameter,
             },
         )
 
-        # API Gateway
-        api = apigw.RestApi(
+        # Published version + alias: SnapStart restores each new environment
+        # from the snapshot taken when the version is published
+        live_alias = lambda_.Alias(
             self,
-            "RuntimeProxyApi",
-            rest_api_name="hertz-runtime-proxy-api",
+            "LiveAlias",
+            alias_name="live",
+            version=runtime_proxy_lambda.current_version,
+        )
+
+        # HTTP API (v2): lower per-request latency and cost than a REST API
+        http_api = apigwv2.HttpApi(
+            self,
+            "RuntimeProxyHttpApi",
+            api_name="hertz-runtime-proxy-api",
             description="API Gateway for React app to invoke AgentCore Runtime",
-            default_cors_preflight_options=apigw.CorsOptions(
-                allow_origins=apigw.Cors.ALL_ORIGINS,
-                allow_methods=apigw.Cors.ALL_METHODS,
+            # Browsers cache the preflight for max_age, so a chat session pays
+            # for OPTIONS once; pin REACT_APP_ORIGIN to the CloudFront URL
+            cors_preflight=apigwv2.CorsPreflightOptions(
+                allow_origins=[os.getenv("REACT_APP_ORIGIN", "*")],
+                allow_methods=[apigwv2.CorsHttpMethod.POST],
                 allow_headers=["Content-Type", "Authorization"],
+                max_age=Duration.hours(1),
             ),
         )
 
         # Add /chat endpoint
-        chat_resource = api.root.add_resource("chat")
-        chat_integration = apigw.LambdaIntegration(runtime_proxy_lambda)
-        chat_resource.add_method("POST", chat_integration)
+        http_api.add_routes(
+            path="/chat",
+            methods=[apigwv2.HttpMethod.POST],
+            integration=integrations.HttpLambdaIntegration(
+                "ChatIntegration", live_alias, timeout=API_TIMEOUT
+            ),
+        )
+
+        # Access logs with latency split (integration vs total) plus per-route metrics;
+        # HTTP APIs have no X-Ray integration, the Lambda traces cover the backend
+        access_log_group = logs.LogGroup(
+            self,
+            "ApiAccessLogs",
+            retention=logs.RetentionDays.ONE_WEEK,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        default_stage = http_api.default_stage.node.default_child
+        default_stage.access_log_settings = apigwv2.CfnStage.AccessLogSettingsProperty(
+            destination_arn=access_log_group.log_group_arn,
+            format=json.dumps({
+                "requestId": "$context.requestId",
+                "ip": "$context.identity.sourceIp",
+                "requestTime": "$context.requestTime",
+                "routeKey": "$context.routeKey",
+                "status": "$context.status",
+                "responseLength": "$context.responseLength",
+                "integrationLatency": "$context.integrationLatency",
+                "responseLatency": "$context.responseLatency",
+                "integrationError": "$context.integrationErrorMessage",
+            }),
+        )
+        default_stage.default_route_settings = apigwv2.CfnStage.RouteSettingsProperty(
+            detailed_metrics_enabled=True,
+        )
+
+        # Count cold starts (full INIT or SnapStart restore) from the REPORT lines
+        logs.MetricFilter(
+            self,
+            "RuntimeProxyColdStarts",
+            log_group=proxy_log_group,
+            filter_pattern=logs.FilterPattern.any_term("Init Duration", "Restore Duration"),
+            metric_namespace="Hertz/RuntimeProxy",
+            metric_name="ColdStarts",
+            metric_value="1",
+            default_value=0,
+        )
+
+        # Keep the trailing slash so consumers can keep appending "chat"
+        api_url = f"{http_api.api_endpoint}/"
 
         # Store API URL in SSM
         ssm.StringParameter(
             self,
             "ApiGatewayUrlParameter",
             parameter_name="/hertz/agentcore/api_gateway_url",
-            string_value=api.url,
+            string_value=api_url,
             description="API Gateway URL for React app",
         )
 
@@ -177,7 +216,7 @@ class ApiGatewayStack(Stack):
         CfnOutput(
             self,
             "ApiGatewayUrl",
-            value=api.url,
+            value=api_url,
             description="API Gateway URL",
             export_name="HertzApiGatewayUrl",
         )
@@ -185,7 +224,7 @@ class ApiGatewayStack(Stack):
         CfnOutput(
             self,
             "ChatEndpoint",
-            value=f"{api.url}chat",
+            value=f"{api_url}chat",
             description="Chat endpoint URL for React app",
             export_name="HertzChatEndpoint",
         )
@@ -10,18 +10,24 @@ from aws_cdk import (
     Duration,
     CfnOutput,
     RemovalPolicy,
+    SecretValue,
     aws_lambda as lambda_,
     aws_iam as iam,
     aws_ssm as ssm,
     aws_bedrockagentcore as agentcore,
     aws_cognito as cognito,
     aws_dynamodb as dynamodb,
+    aws_secretsmanager as secretsmanager,
 )
 from constructs import Construct
 import json
 import os
 
 
+# Last fleet table index stage (see the rollout list in HertzMcpStack)
+FLEET_INDEX_STAGES = 6
+
+
 class HertzMcpStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -42,27 +48,72 @@ class HertzMcpStack(Stack):
             point_in_time_recovery=True,
         )
         
-        # Add GSI for querying by zip code
-        fleet_table.add_global_secondary_index(
-            index_name="zip_code-index",
-            partition_key=dynamodb.Attribute(
-                name="zip_code",
-                type=dynamodb.AttributeType.STRING
-            ),
-            sort_key=dynamodb.Attribute(
-                name="status",
-                type=dynamodb.AttributeType.STRING
-            ),
-        )
-        
-        # Add GSI for querying by location
-        fleet_table.add_global_secondary_index(
-            index_name="location-index",
-            partition_key=dynamodb.Attribute(
-                name="location",
-                type=dynamodb.AttributeType.STRING
-            ),
-        )
+        # GSIs project only what the fleet tools and frontends read; vehicle_id
+        # and each index's own keys are always projected by DynamoDB
+        fleet_projection = ["make", "model", "year", "category", "daily_rate", "mileage"]
+        search_projection = fleet_projection + ["location", "zip_code", "status"]
+
+        # DynamoDB creates or deletes at most one GSI per table update, and a
+        # projection can't be changed in place, so index changes are rolled out
+        # as numbered stages that each add or remove exactly one index. A new
+        # table is created at the final stage in one deploy; deploy_all.sh walks
+        # an existing table through the stages it hasn't reached yet.
+        # Stage 0 is the original table (zip_code-index and location-index, ALL).
+        index_stage = self.node.try_get_context("fleet_index_stage")
+        index_stage = FLEET_INDEX_STAGES if index_stage is None else int(index_stage)
+
+        def string_key(name):
+            return dynamodb.Attribute(name=name, type=dynamodb.AttributeType.STRING)
+
+        # (stage added, stage removed or None, index definition)
+        fleet_indexes = [
+            (0, 2, dict(
+                index_name="zip_code-index",
+                partition_key=string_key("zip_code"),
+                sort_key=string_key("status"),
+            )),
+            (0, 4, dict(
+                index_name="location-index",
+                partition_key=string_key("location"),
+            )),
+            # Query by zip code (optionally status)
+            (1, None, dict(
+                index_name="zip_code-index-v2",
+                partition_key=string_key("zip_code"),
+                sort_key=string_key("status"),
+                projection_type=dynamodb.ProjectionType.INCLUDE,
+                non_key_attributes=fleet_projection + ["location"],
+            )),
+            # Query by location
+            (3, None, dict(
+                index_name="location-index-v2",
+                partition_key=string_key("location"),
+                projection_type=dynamodb.ProjectionType.INCLUDE,
+                non_key_attributes=fleet_projection + ["zip_code", "status"],
+            )),
+            # Cross-location search (search_vehicles_general) queries one of these
+            # instead of scanning the table. It is keyed on the lowercase
+            # make_key/model_key copies written at load time, with model as the
+            # sort key so a make + model prefix is a single key condition; the
+            # display make/model are projected. Status has only three
+            # values, so it is filtered in Python rather than indexed.
+            (5, None, dict(
+                index_name="make_model-index",
+                partition_key=string_key("make_key"),
+                sort_key=string_key("model_key"),
+                projection_type=dynamodb.ProjectionType.INCLUDE,
+                non_key_attributes=search_projection,
+            )),
+            (6, None, dict(
+                index_name="category-index",
+                partition_key=string_key("category"),
+                projection_type=dynamodb.ProjectionType.INCLUDE,
+                non_key_attributes=[a for a in search_projection if a != "category"],
+            )),
+        ]
+        for added, removed, index in fleet_indexes:
+            if added <= index_stage and (removed is None or index_stage < removed):
+                fleet_table.add_global_secondary_index(**index)
 
         # ========================================================================
         # Lambda Execution Role (shared by both functions)
@@ -83,21 +134,53 @@ class HertzMcpStack(Stack):
         # Grant DynamoDB access to Lambda role
         fleet_table.grant_read_write_data(lambda_role)
 
+        # ========================================================================
+        # External API keys (Ticketmaster, AviationStack)
+        # ========================================================================
+        # Created with empty placeholders so the keys never appear in the
+        # template; deploy_gateway.py writes the real values from .env
+        api_keys_secret = secretsmanager.Secret(
+            self,
+            "ExternalApiKeys",
+            secret_name="hertz/external-api-keys",
+            description="Third-party API keys used by Hertz tools",
+            secret_object_value={
+                "ticketmaster": SecretValue.unsafe_plain_text(""),
+                "aviationstack": SecretValue.unsafe_plain_text(""),
+            },
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+        api_keys_secret.grant_read(lambda_role)
+
         # ========================================================================
         # Lambda Functions
         # ========================================================================
         
+        # Shared helpers layer; each function ships only its own handler file
+        shared_layer = lambda_.LayerVersion(
+            self,
+            "HertzSharedLayer",
+            code=lambda_.Code.from_asset("../lambda/shared"),
+            compatible_runtimes=[lambda_.Runtime.PYTHON_3_12],
+            compatible_architectures=[lambda_.Architecture.ARM_64],
+            description="Shared helpers for Hertz gateway tool Lambdas",
+        )
+        
         # Weather Lambda
         weather_lambda = lambda_.Function(
             self,
             "WeatherForecastFunction",
             function_name="hertz-weather-forecast",
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             handler="weather_lambda.lambda_handler",
-            code=lambda_.Code.from_asset("../lambda"),
+            code=lambda_.Code.from_asset("../lambda", exclude=["*", "!weather_lambda.py"]),
+            layers=[shared_layer],
             role=lambda_role,
             timeout=Duration.seconds(30),
-            memory_size=256,
+            memory_size=1024,
+            reserved_concurrent_executions=20,  # bound fan-in to the upstream API
+            tracing=lambda_.Tracing.ACTIVE,
             description="Weather forecast tool for AgentCore Gateway",
             environment={
                 "LOG_LEVEL": "INFO"
@@ -110,15 +193,22 @@ class HertzMcpStack(Stack):
             "FlightTrafficFunction",
             function_name="hertz-flight-traffic",
             runtime=lambda_.Runtime.PYTHON_3_12,
+            architecture=lambda_.Architecture.ARM_64,
             handler="flight_lambda.lambda_handler",
-            code=lambda_.Code.from_asset("../lambda"),
+            code=lambda_.Code.from_asset("../lambda", exclude=["*", "!flight_lambda.py"]),
+            layers=[shared_layer],
             role=lambda_role,
             timeout=Duration.seconds(30),
-            memory_size=256,
+            memory_size=1024,
+            reserved_concurrent_executions=20,  # bound fan-in to the upstream API
+            tracing=lambda_.Tracing.ACTIVE,
             description="Flight traffic tool for AgentCore Gateway",
             environment={
                 "LOG_LEVEL": "INFO",
-                "AVIATIONSTACK_API_KEY": os.environ.get("AVIATIONSTACK_API_KEY", "")
+                "SECRETS_ARN": api_keys_secret.secret_arn,
+                "AVIATIONSTACK_FLIGHTS_URL": os.getenv(
+                    "AVIATIONSTACK_FLIGHTS_URL", "http://api.aviationstack.com/v1/flights"
+                ),
             }
         )
 
@@ -165,6 +255,7 @@ class HertzMcpStack(Stack):
         
         # Grant DynamoDB read access to runtime role
         fleet_table.grant_read_data(runtime_role)
+        api_keys_secret.grant_read(runtime_role)
         
         # Add Gateway access policy
         runtime_role.add_to_policy(
@@ -288,7 +379,7 @@ class HertzMcpStack(Stack):
                     "bedrock-agentcore:InvokeAgentRuntime",
                     "bedrock-agentcore:GetAgentRuntime",
                 ],
-                resources=[runtime_role.role_arn.replace(":role/", ":runtime/*")],
+                resources=[f"arn:aws:bedrock-agentcore:{self.region}:{self.account}:runtime/*"],
             )
         )
         
@@ -374,6 +465,13 @@ class HertzMcpStack(Stack):
             export_name="HertzFlightLambdaArn",
         )
 
+        CfnOutput(
+            self,
+            "ExternalApiKeysSecretArn",
+            value=api_keys_secret.secret_arn,
+            description="Secrets Manager secret holding third-party API keys",
+        )
+
         CfnOutput(
             self,
             "LambdaRoleArn",
@@ -445,3 +543,10 @@ class HertzMcpStack(Stack):
             description="DynamoDB Fleet Inventory Table ARN",
             export_name="HertzFleetTableArn",
         )
+
+        CfnOutput(
+            self,
+            "FleetIndexStage",
+            value=str(index_stage),
+            description="Fleet table GSI rollout stage (read by deploy_all.sh)",
+        )
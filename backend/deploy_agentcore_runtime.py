@@ -2,13 +2,15 @@
 Deploy Strands Agent to Amazon Bedrock AgentCore Runtime
 This script deploys the agent as a production-ready, scalable service
 """
-import boto3
+import functools
+import random
+import re
 import time
 import os
 import json
-from dotenv import load_dotenv
+from concurrent.futures import ThreadPoolExecutor
 
-load_dotenv(".env")
+from stack_outputs import get_cdk_outputs
 
 # Check if bedrock_agentcore_starter_toolkit is available
 try:
@@ -19,10 +21,30 @@ except ImportError:
     print("   Install it with: pip install bedrock-agentcore-starter-toolkit")
     exit(1)
 
+# "# API Keys" header plus its ENV *_API_KEY lines, as injected by earlier deploys
+_STALE_API_KEYS = re.compile(r"\n# API Keys\n(?:ENV \w+_API_KEY=.*\n)+")
+
+
+@functools.lru_cache(maxsize=None)
+def _session():
+    """boto3 session, created on first use so .env is loaded before credentials resolve"""
+    import boto3
+    return boto3.session.Session()
+
+
+@functools.lru_cache(maxsize=None)
+def _client(name):
+    """One boto3 client per service for the whole script"""
+    from botocore.config import Config
+    # Adaptive retries absorb throttling from the parallel IAM calls; the larger
+    # pool keeps concurrent requests from queueing on the default 10 connections
+    config = Config(retries={"mode": "adaptive", "max_attempts": 10}, max_pool_connections=50)
+    return _session().client(name, config=config)
+
 
 def get_ssm_parameter(name: str) -> str:
     """Retrieve parameter from AWS Systems Manager Parameter Store"""
-    ssm = boto3.client('ssm')
+    ssm = _client('ssm')
     try:
         response = ssm.get_parameter(Name=name, WithDecryption=True)
         return response['Parameter']['Value']
@@ -32,7 +54,7 @@ def get_ssm_parameter(name: str) -> str:
 
 def put_ssm_parameter(name: str, value: str) -> str:
     """Store parameter in AWS Systems Manager Parameter Store"""
-    ssm = boto3.client('ssm')
+    ssm = _client('ssm')
     try:
         ssm.put_parameter(
             Name=name,
@@ -49,7 +71,7 @@ def put_ssm_parameter(name: str, value: str) -> str:
 
 def create_execution_role():
     """Create IAM execution role for AgentCore Runtime"""
-    iam = boto3.client('iam')
+    iam = _client('iam')
     role_name = "HertzStrandsAgentCoreRuntimeRole"
     
     trust_policy = {
@@ -71,8 +93,8 @@ def create_execution_role():
         role_arn = response['Role']['Arn']
         print(f"✅ Using existing role: {role_arn}")
         
-        # Ensure all policies are attached (in case of partial deployment)
-        _attach_policies(iam, role_name)
+        # Attach only what is missing (in case of partial deployment)
+        _attach_policies(iam, role_name, only_missing=True)
         
         return role_arn
     except iam.exceptions.NoSuchEntityException:
@@ -89,15 +111,42 @@ def create_execution_role():
         _attach_policies(iam, role_name)
         
         print(f"✅ Created role: {role_arn}")
-        print("   Waiting 10 seconds for IAM propagation...")
-        time.sleep(10)
+        _wait_for_role(iam, role_name)
         
         return role_arn
 
 
-def _attach_policies(iam, role_name):
-    """Attach all necessary policies to the runtime role"""
-    # AWS managed policies
+def _wait_for_role(iam, role_name, max_wait=10):
+    """Poll until the new role is readable instead of sleeping a fixed 10 seconds"""
+    print("   Waiting for IAM propagation...")
+    deadline = time.monotonic() + max_wait
+    for delay in (0.5, 1, 1, 2, 2, 4):
+        try:
+            iam.get_role(RoleName=role_name)
+            return
+        except iam.exceptions.NoSuchEntityException:
+            if time.monotonic() + delay > deadline:
+                break
+            time.sleep(delay)
+    print(f"   ⚠️  Role not visible after {max_wait}s; continuing")
+
+
+def _with_retry(call, attempts=4):
+    """Run an IAM write, retrying ConcurrentModification from parallel role updates"""
+    for attempt in range(1, attempts + 1):
+        try:
+            return call()
+        except Exception as e:
+            code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if code != "ConcurrentModification" or attempt == attempts:
+                raise
+            time.sleep(0.5 * attempt)
+
+
+def _attach_policies(iam, role_name, only_missing=False):
+    """Attach all necessary policies to the runtime role (only the missing ones for an existing role)"""
+    # AWS managed policies: fixed arn:aws:iam::aws:policy/* ARNs that always
+    # exist, so there is no lookup or not-found handling for them
     managed_policies = [
         "arn:aws:iam::aws:policy/AmazonBedrockFullAccess",
         "arn:aws:iam::aws:policy/CloudWatchLogsFullAccess",
@@ -106,12 +155,10 @@ def _attach_policies(iam, role_name):
         "arn:aws:iam::aws:policy/AmazonDynamoDBReadOnlyAccess"
     ]
     
-    for policy_arn in managed_policies:
+    def attach(policy_arn):
         try:
-            iam.attach_role_policy(RoleName=role_name, PolicyArn=policy_arn)
+            _with_retry(lambda: iam.attach_role_policy(RoleName=role_name, PolicyArn=policy_arn))
             print(f"  ✅ Attached: {policy_arn.split('/')[-1]}")
-        except iam.exceptions.NoSuchEntityException:
-            print(f"  ⚠️  Policy not found: {policy_arn}")
         except Exception as e:
             if "already attached" not in str(e).lower():
                 print(f"  ⚠️  Error attaching {policy_arn}: {e}")
@@ -127,19 +174,53 @@ def _attach_policies(iam, role_name):
                     "bedrock-agentcore:InvokeGateway"
                 ],
                 "Resource": "*"
+            },
+            {
+                # Third-party API keys (see ExternalApiKeys in hertz_mcp_stack.py)
+                "Effect": "Allow",
+                "Action": "secretsmanager:GetSecretValue",
+                "Resource": "arn:aws:secretsmanager:*:*:secret:hertz/external-api-keys-*"
             }
         ]
     }
     
-    try:
-        iam.put_role_policy(
-            RoleName=role_name,
-            PolicyName="GatewayAccess",
-            PolicyDocument=json.dumps(gateway_policy)
-        )
-        print(f"  ✅ Attached: GatewayAccess (inline)")
-    except Exception as e:
-        print(f"  ⚠️  Error attaching inline policy: {e}")
+    def put_inline():
+        try:
+            _with_retry(lambda: iam.put_role_policy(
+                RoleName=role_name,
+                PolicyName="GatewayAccess",
+                PolicyDocument=json.dumps(gateway_policy)
+            ))
+            print(f"  ✅ Attached: GatewayAccess (inline)")
+        except Exception as e:
+            print(f"  ⚠️  Error attaching inline policy: {e}")
+    
+    inline_needed = True
+    if only_missing:
+        # One read per policy kind instead of six writes on every run
+        paginator = iam.get_paginator("list_attached_role_policies")
+        attached = {
+            p["PolicyArn"]
+            for page in paginator.paginate(RoleName=role_name)
+            for p in page["AttachedPolicies"]
+        }
+        managed_policies = [arn for arn in managed_policies if arn not in attached]
+        try:
+            current = iam.get_role_policy(RoleName=role_name, PolicyName="GatewayAccess")
+            inline_needed = current["PolicyDocument"] != gateway_policy
+        except iam.exceptions.NoSuchEntityException:
+            pass
+        if not managed_policies and not inline_needed:
+            print("  ✅ All policies already attached")
+            return
+    
+    # IAM writes are independent round-trips; boto3 clients are thread-safe
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        futures = [executor.submit(attach, arn) for arn in managed_policies]
+        if inline_needed:
+            futures.append(executor.submit(put_inline))
+        for future in futures:
+            future.result()
 
 
 def main():
@@ -147,9 +228,11 @@ def main():
     print("Deploying Strands Agent to AgentCore Runtime")
     print("=" * 60)
     
-    # Initialize boto session
-    boto_session = boto3.session.Session()
-    region = boto_session.region_name
+    # Resolve the credential chain up front so the first step's timing
+    # reflects its own work, not provider discovery
+    session = _session()
+    session.get_credentials()
+    region = session.region_name
     print(f"\n📍 Region: {region}")
     
     # Create execution role
@@ -170,11 +253,11 @@ def main():
     
     # Get Cognito configuration from CDK outputs
     try:
-        cfn = boto3.client("cloudformation", region_name=region)
-        stack = cfn.describe_stacks(StackName="HertzMcpStack")
-        outputs = {o["OutputKey"]: o["OutputValue"] for o in stack["Stacks"][0]["Outputs"]}
+        outputs = get_cdk_outputs("HertzMcpStack", _client("cloudformation"))
         cognito_user_pool_id = outputs.get("CognitoUserPoolId")
         cognito_client_id = outputs.get("CognitoClientId")
+        fleet_table_name = outputs.get("FleetTableName")
+        api_keys_secret_arn = outputs.get("ExternalApiKeysSecretArn")
         print(f"   Retrieved Cognito config from CDK:")
         print(f"   - User Pool: {cognito_user_pool_id}")
         print(f"   - Client ID: {cognito_client_id}")
@@ -182,6 +265,8 @@ def main():
         print(f"   ⚠️  Could not get Cognito from CDK, trying environment variables...")
         cognito_client_id = os.getenv("COGNITO_CLIENT_ID")
         cognito_user_pool_id = os.getenv("COGNITO_USER_POOL_ID")
+        fleet_table_name = os.getenv("FLEET_TABLE_NAME")
+        api_keys_secret_arn = os.getenv("SECRETS_ARN")
     
     config_params = {
         "entrypoint": "strands_runtime.py",
@@ -198,28 +283,26 @@ def main():
     response = agentcore_runtime.configure(**config_params)
     print(f"✅ Configuration complete")
     
-    # Inject API keys into the generated Dockerfile
+    # API keys now come from Secrets Manager; strip any key block an older
+    # deploy injected so it is never baked into the image
     dockerfile_path = os.path.join(backend_dir, "Dockerfile")
     if os.path.exists(dockerfile_path):
         with open(dockerfile_path, "r") as f:
             dockerfile_content = f.read()
-        
-        # Find the ENV section and add our API keys
-        if "ENV AWS_REGION" in dockerfile_content and "TICKETMASTER_API_KEY" not in dockerfile_content:
-            # Add API keys after AWS_REGION
-            dockerfile_content = dockerfile_content.replace(
-                "ENV AWS_REGION=us-east-1\nENV AWS_DEFAULT_REGION=us-east-1",
-                "ENV AWS_REGION=us-east-1\nENV AWS_DEFAULT_REGION=us-east-1\n\n# API Keys\nENV TICKETMASTER_API_KEY=ovM0gHqGMvcrzDbhtuT87VCxpYd0ioLA\nENV AVIATIONSTACK_API_KEY=24de2d517415e5f9b723203ecb288daf"
-            )
-            
+        cleaned = _STALE_API_KEYS.sub("", dockerfile_content)
+        if cleaned != dockerfile_content:
             with open(dockerfile_path, "w") as f:
-                f.write(dockerfile_content)
-            print(f"✅ Injected API keys into Dockerfile")
+                f.write(cleaned)
+            print(f"✅ Removed stale API keys from Dockerfile")
     
     # Prepare environment variables
     env_vars = {
         "AWS_REGION": region,
     }
+    if fleet_table_name:
+        env_vars["FLEET_TABLE_NAME"] = fleet_table_name
+    if api_keys_secret_arn:
+        env_vars["SECRETS_ARN"] = api_keys_secret_arn
     
     # Add optional environment variables if they exist
     optional_vars = [
@@ -228,8 +311,6 @@ def main():
         "COGNITO_CLIENT_ID",
         "COGNITO_TEST_USERNAME",
         "COGNITO_TEST_PASSWORD",
-        "TICKETMASTER_API_KEY",
-        "AVIATIONSTACK_API_KEY"
     ]
     
     for var in optional_vars:
@@ -255,11 +336,22 @@ def main():
         status = status_response.endpoint["status"]
         
         end_status = ["READY", "CREATE_FAILED", "DELETE_FAILED", "UPDATE_FAILED"]
+        max_wait_time = 1800  # container builds can be slow; never wait forever
+        deadline = time.monotonic() + max_wait_time
+        delay = 5  # grows 1.5x per poll up to 30s, with jitter
+        print(f"   Status: {status}")
         while status not in end_status:
-            print(f"   Status: {status} (checking again in 10 seconds...)")
-            time.sleep(10)
+            if time.monotonic() >= deadline:
+                print(f"   ⚠️  Runtime not ready after {max_wait_time}s (last status: {status})")
+                break
+            time.sleep(min(delay, 30) + random.uniform(0, 0.5))
+            delay = min(delay * 1.5, 30)
             status_response = agentcore_runtime.status()
-            status = status_response.endpoint["status"]
+            new_status = status_response.endpoint["status"]
+            # Only report transitions to keep long deploys readable
+            if new_status != status:
+                print(f"   Status: {new_status}")
+            status = new_status
         
         print(f"\n✅ Final status: {status}")
         
@@ -275,12 +367,16 @@ def main():
             
             # Update .bedrock_agentcore.yaml with the new runtime ARN
             import yaml
+            try:
+                from yaml import CSafeLoader as SafeLoader, CSafeDumper as SafeDumper
+            except ImportError:  # PyYAML built without libyaml
+                from yaml import SafeLoader, SafeDumper
             # Look for config in backend directory (where it's generated)
             config_path = os.path.join(backend_dir, ".bedrock_agentcore.yaml")
             try:
                 if os.path.exists(config_path):
                     with open(config_path, "r") as f:
-                        config = yaml.safe_load(f)
+                        config = yaml.load(f, Loader=SafeLoader)
                     
                     # Extract runtime ID from ARN
                     runtime_id = agent_arn.split("/")[-1]
@@ -293,7 +389,7 @@ def main():
                         config["agents"][agent_name]["bedrock_agentcore"]["agent_session_id"] = None
                         
                         with open(config_path, "w") as f:
-                            yaml.dump(config, f, default_flow_style=False, sort_keys=False)
+                            yaml.dump(config, f, Dumper=SafeDumper, default_flow_style=False, sort_keys=False)
                         
                         print(f"✅ Updated .bedrock_agentcore.yaml with runtime ARN")
                 else:
@@ -320,4 +416,6 @@ def main():
 
 
 if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv(".env")
     exit(main())
@@ -4,24 +4,142 @@ Deploy AgentCore Gateway using boto3
 This runs after CDK deployment to create the gateway
 """
 import boto3
+import functools
 import json
+import random
 import sys
 import time
 import os
+from botocore.config import Config
+from concurrent.futures import ThreadPoolExecutor
+
+from stack_outputs import get_cdk_outputs
+
+REGION = "us-east-1"
+_SESSION = boto3.session.Session(region_name=REGION)
+
+# Adaptive retries absorb throttling from the parallel calls; the larger pool
+# keeps concurrent requests from queueing on the default 10 connections
+_CLIENT_CONFIG = Config(retries={"mode": "adaptive", "max_attempts": 10}, max_pool_connections=50)
+
+
+@functools.lru_cache(maxsize=None)
+def _client(name):
+    """One boto3 client per service for the whole script"""
+    return _SESSION.client(name, config=_CLIENT_CONFIG)
+
+
+@functools.lru_cache(maxsize=None)
+def load_api_spec(path):
+    """Parse a tool spec once per process"""
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def put_parameters(ssm, params):
+    """Write (name, value) String parameters concurrently"""
+    def put(param):
+        name, value = param
+        ssm.put_parameter(Name=name, Value=value, Type="String", Overwrite=True)
+    
+    with ThreadPoolExecutor(max_workers=len(params)) as executor:
+        list(executor.map(put, params))
+
+
+def store_api_keys(secretsmanager, secret_arn):
+    """Merge API keys from the environment into the tools' secret"""
+    new_keys = {
+        "ticketmaster": os.getenv("TICKETMASTER_API_KEY", ""),
+        "aviationstack": os.getenv("AVIATIONSTACK_API_KEY", ""),
+    }
+    new_keys = {k: v for k, v in new_keys.items() if v}
+    if not new_keys:
+        print("⚠️  No TICKETMASTER_API_KEY / AVIATIONSTACK_API_KEY set; leaving API key secret unchanged")
+        return
+    
+    try:
+        current = json.loads(secretsmanager.get_secret_value(SecretId=secret_arn)["SecretString"])
+        merged = {**current, **new_keys}
+        if merged != current:
+            secretsmanager.put_secret_value(SecretId=secret_arn, SecretString=json.dumps(merged))
+        print(f"✅ API keys stored in Secrets Manager: {', '.join(sorted(new_keys))}")
+    except Exception as e:
+        print(f"⚠️  Could not store API keys: {e}")
+
+
+def list_targets(gateway_client, gateway_id):
+    """Map target name -> targetId across all pages"""
+    targets = {}
+    params = {"gatewayIdentifier": gateway_id}
+    while True:
+        page = gateway_client.list_gateway_targets(**params)
+        targets.update({t["name"]: t["targetId"] for t in page.get("items", [])})
+        if not page.get("nextToken"):
+            return targets
+        params["nextToken"] = page["nextToken"]
+
+
+def ensure_target(gateway_client, gateway_id, existing_targets, name, label, lambda_arn, api_spec, description):
+    """Create a Lambda-backed gateway target, or update an existing one whose schema changed; returns its id"""
+    target_configuration = {
+        "mcp": {
+            "lambda": {
+                "lambdaArn": lambda_arn,
+                "toolSchema": {"inlinePayload": api_spec}
+            }
+        }
+    }
+    credential_providers = [{"credentialProviderType": "GATEWAY_IAM_ROLE"}]
+    try:
+        target_id = existing_targets.get(name)
+        if target_id:
+            # Redeploys must still push spec changes (e.g. new batch parameters) to the gateway
+            current = gateway_client.get_gateway_target(gatewayIdentifier=gateway_id, targetId=target_id)
+            if current.get("targetConfiguration") == target_configuration:
+                print(f"✅ {label} target already up to date: {target_id}")
+                return target_id
+            
+            print(f"🔧 Updating {label.lower()} target schema...")
+            gateway_client.update_gateway_target(
+                gatewayIdentifier=gateway_id,
+                targetId=target_id,
+                name=name,
+                description=description,
+                targetConfiguration=target_configuration,
+                credentialProviderConfigurations=credential_providers,
+            )
+            print(f"✅ {label} target updated: {target_id}")
+            return target_id
+        
+        print(f"🔧 Creating {label.lower()} target...")
+        target_response = gateway_client.create_gateway_target(
+            gatewayIdentifier=gateway_id,
+            name=name,
+            description=description,
+            targetConfiguration=target_configuration,
+            credentialProviderConfigurations=credential_providers,
+        )
+        
+        target_id = target_response["targetId"]
+        print(f"✅ {label} target created: {target_id}")
+        return target_id
+    except Exception as e:
+        print(f"⚠️  Error with {label.lower()} target: {e}")
+        return None
+
 
 def main():
     print("╔══════════════════════════════════════════════════════════════════════════╗")
     print("║         AgentCore Gateway Deployment - Weather + Flight Tools           ║")
     print("╚══════════════════════════════════════════════════════════════════════════╝\n")
     
-    region = "us-east-1"
+    # Resolve the credential chain up front so the first step's timing
+    # reflects its own work, not provider discovery
+    _SESSION.get_credentials()
     
     # Get stack outputs
-    cfn = boto3.client("cloudformation", region_name=region)
-    
     try:
-        stack = cfn.describe_stacks(StackName="HertzMcpStack")
-        outputs = {o["OutputKey"]: o["OutputValue"] for o in stack["Stacks"][0]["Outputs"]}
+        outputs = get_cdk_outputs("HertzMcpStack", _client("cloudformation"))
         
         weather_lambda_arn = outputs["WeatherLambdaArn"]
         flight_lambda_arn = outputs["FlightLambdaArn"]
@@ -29,6 +147,7 @@ def main():
         cognito_user_pool_id = outputs["CognitoUserPoolId"]
         cognito_client_id = outputs["CognitoClientId"]
         cognito_issuer = outputs["CognitoIssuer"]
+        api_keys_secret_arn = outputs.get("ExternalApiKeysSecretArn")
         
         print(f"✅ Retrieved CDK outputs:")
         print(f"   Weather Lambda ARN: {weather_lambda_arn}")
@@ -43,31 +162,62 @@ def main():
         sys.exit(1)
     
     # Initialize clients
-    gateway_client = boto3.client("bedrock-agentcore-control", region_name=region)
-    ssm = boto3.client("ssm", region_name=region)
-    cognito_client = boto3.client("cognito-idp", region_name=region)
+    gateway_client = _client("bedrock-agentcore-control")
+    ssm = _client("ssm")
+    cognito_client = _client("cognito-idp")
     
-    # Load API specs (MCP format)
-    with open("lambda/weather_api_spec.json", "r") as f:
-        weather_api_spec = json.load(f)
+    # Store third-party API keys in Secrets Manager (kept out of the CDK template)
+    if api_keys_secret_arn:
+        store_api_keys(_client("secretsmanager"), api_keys_secret_arn)
     
-    with open("lambda/flight_api_spec_mcp.json", "r") as f:
-        flight_api_spec = json.load(f)
+    # Load API specs (MCP format)
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        weather_api_spec, flight_api_spec = executor.map(
+            load_api_spec, ["lambda/weather_api_spec.json", "lambda/flight_api_spec_mcp.json"]
+        )
     
     # Check if gateway already exists
     print("\n[1/3] Checking for existing gateway...")
-    try:
-        gateway_id_param = ssm.get_parameter(Name="/hertz/agentcore/weather_gateway_id")
-        gateway_id = gateway_id_param["Parameter"]["Value"]
+    # id/url/arn were all stored when the gateway was created; one read.
+    # weather_gateway_id is the legacy copy of gateway_id written by older
+    # deployments, read only as a fallback
+    stored = {
+        p["Name"]: p["Value"]
+        for p in ssm.get_parameters(Names=[
+            "/hertz/agentcore/gateway_id",
+            "/hertz/agentcore/weather_gateway_id",
+            "/hertz/agentcore/weather_gateway_url",
+            "/hertz/agentcore/weather_gateway_arn",
+        ])["Parameters"]
+    }
+    gateway_id = (
+        stored.get("/hertz/agentcore/gateway_id")
+        or stored.get("/hertz/agentcore/weather_gateway_id")
+    )
+    existing_targets = None
+    if gateway_id:
+        # Listing targets is needed anyway and 404s like get_gateway would,
+        # so it doubles as the existence check
+        try:
+            existing_targets = list_targets(gateway_client, gateway_id)
+        except gateway_client.exceptions.ResourceNotFoundException:
+            print(f"⚠️  Stored gateway {gateway_id} no longer exists")
+    
+    if existing_targets is not None:
+        gateway_url = stored.get("/hertz/agentcore/weather_gateway_url")
+        gateway_arn = stored.get("/hertz/agentcore/weather_gateway_arn")
+        if not (gateway_url and gateway_arn):
+            gateway_info = gateway_client.get_gateway(gatewayIdentifier=gateway_id)
+            gateway_url = gateway_info["gatewayUrl"]
+            gateway_arn = gateway_info["gatewayArn"]
         
-        # Verify it exists
-        gateway_info = gateway_client.get_gateway(gatewayIdentifier=gateway_id)
-        gateway_url = gateway_info["gatewayUrl"]
-        gateway_arn = gateway_info["gatewayArn"]
+        if "/hertz/agentcore/gateway_id" not in stored:
+            put_parameters(ssm, [("/hertz/agentcore/gateway_id", gateway_id)])
         
         print(f"✅ Gateway already exists: {gateway_id}")
         print(f"   URL: {gateway_url}")
-    except (ssm.exceptions.ParameterNotFound, gateway_client.exceptions.ResourceNotFoundException):
+    else:
+        existing_targets = {}  # a new gateway has no targets yet
         print("🔧 Creating new gateway...")
         
         # Create gateway
@@ -96,40 +246,21 @@ def main():
         print(f"   URL: {gateway_url}")
         
         # Store in SSM
-        ssm.put_parameter(
-            Name="/hertz/agentcore/weather_gateway_id",
-            Value=gateway_id,
-            Type="String",
-            Overwrite=True
-        )
-        ssm.put_parameter(
-            Name="/hertz/agentcore/weather_gateway_url",
-            Value=gateway_url,
-            Type="String",
-            Overwrite=True
-        )
-        ssm.put_parameter(
-            Name="/hertz/agentcore/weather_gateway_arn",
-            Value=gateway_arn,
-            Type="String",
-            Overwrite=True
-        )
-        # Also store as gateway_id for runtime compatibility
-        ssm.put_parameter(
-            Name="/hertz/agentcore/gateway_id",
-            Value=gateway_id,
-            Type="String",
-            Overwrite=True
-        )
+        put_parameters(ssm, [
+            ("/hertz/agentcore/gateway_id", gateway_id),
+            ("/hertz/agentcore/weather_gateway_url", gateway_url),
+            ("/hertz/agentcore/weather_gateway_arn", gateway_arn),
+        ])
         print("✅ Configuration stored in SSM")
         
         # Wait for gateway to be ACTIVE
         print("⏳ Waiting for gateway to become ACTIVE...")
         max_wait_time = 300  # 5 minutes
-        wait_interval = 10  # 10 seconds
+        delay = 2  # grows 1.5x per poll up to 15s, with jitter
         elapsed_time = 0
         
         while elapsed_time < max_wait_time:
+            wait_interval = min(delay, 15, max_wait_time - elapsed_time) + random.uniform(0, 0.5)
             try:
                 gateway_info = gateway_client.get_gateway(gatewayIdentifier=gateway_id)
                 status = gateway_info.get("status")
@@ -141,13 +272,12 @@ def main():
                     print(f"❌ Gateway entered {status} state")
                     sys.exit(1)
                 else:
-                    print(f"   Status: {status} (waiting {wait_interval}s...)")
-                    time.sleep(wait_interval)
-                    elapsed_time += wait_interval
+                    print(f"   Status: {status} (waiting {wait_interval:.1f}s...)")
             except Exception as e:
                 print(f"⚠️  Error checking gateway status: {e}")
-                time.sleep(wait_interval)
-                elapsed_time += wait_interval
+            time.sleep(wait_interval)
+            elapsed_time += wait_interval
+            delay *= 1.5
         
         if elapsed_time >= max_wait_time:
             print(f"⚠️  Gateway did not become READY within {max_wait_time}s")
@@ -156,77 +286,20 @@ def main():
     # Add Lambda targets
     print("\n[2/3] Configuring gateway targets...")
     
-    # Weather target
-    try:
-        targets = gateway_client.list_gateway_targets(gatewayIdentifier=gateway_id)
-        existing_weather_target = None
-        for target in targets.get("items", []):
-            if target["name"] == "WeatherForecastTool":
-                existing_weather_target = target["targetId"]
-                break
-        
-        if existing_weather_target:
-            print(f"✅ Weather target already exists: {existing_weather_target}")
-        else:
-            print("🔧 Creating weather target...")
-            
-            target_response = gateway_client.create_gateway_target(
-                gatewayIdentifier=gateway_id,
-                name="WeatherForecastTool",
-                description="Weather forecast tool for demand prediction",
-                targetConfiguration={
-                    "mcp": {
-                        "lambda": {
-                            "lambdaArn": weather_lambda_arn,
-                            "toolSchema": {"inlinePayload": weather_api_spec}
-                        }
-                    }
-                },
-                credentialProviderConfigurations=[
-                    {"credentialProviderType": "GATEWAY_IAM_ROLE"}
-                ]
-            )
-            
-            target_id = target_response["targetId"]
-            print(f"✅ Weather target created: {target_id}")
-    except Exception as e:
-        print(f"⚠️  Error with weather target: {e}")
-    
-    # Flight target
-    try:
-        targets = gateway_client.list_gateway_targets(gatewayIdentifier=gateway_id)
-        existing_flight_target = None
-        for target in targets.get("items", []):
-            if target["name"] == "FlightTrafficTool":
-                existing_flight_target = target["targetId"]
-                break
-        
-        if existing_flight_target:
-            print(f"✅ Flight target already exists: {existing_flight_target}")
-        else:
-            print("🔧 Creating flight target...")
-            
-            target_response = gateway_client.create_gateway_target(
-                gatewayIdentifier=gateway_id,
-                name="FlightTrafficTool",
-                description="Flight traffic tool for airport demand prediction",
-                targetConfiguration={
-                    "mcp": {
-                        "lambda": {
-                            "lambdaArn": flight_lambda_arn,
-                            "toolSchema": {"inlinePayload": flight_api_spec}
-                        }
-                    }
-                },
-                credentialProviderConfigurations=[
-                    {"credentialProviderType": "GATEWAY_IAM_ROLE"}
-                ]
-            )
-            
-            target_id = target_response["targetId"]
-            print(f"✅ Flight target created: {target_id}")
-    except Exception as e:
-        print(f"⚠️  Error with flight target: {e}")
+    # Targets are independent control-plane calls; create them concurrently
+    targets = [
+        ("WeatherForecastTool", "Weather", weather_lambda_arn, weather_api_spec,
+         "Weather forecast tool for demand prediction"),
+        ("FlightTrafficTool", "Flight", flight_lambda_arn, flight_api_spec,
+         "Flight traffic tool for airport demand prediction"),
+    ]
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = [
+            executor.submit(ensure_target, gateway_client, gateway_id, existing_targets, *target)
+            for target in targets
+        ]
+        for future in futures:
+            future.result()
     
     # Create test user
     print("\n[3/5] Creating Cognito test user...")
@@ -304,27 +377,27 @@ def main():
     with open(env_path, "r") as f:
         env_content = f.read()
     
-    env_updates = []
-    if "MCP_GATEWAY_URL" not in env_content:
-        env_updates.append(f"MCP_GATEWAY_URL={gateway_url}")
-    if "WEATHER_LAMBDA_ARN" not in env_content:
-        env_updates.append(f"WEATHER_LAMBDA_ARN={weather_lambda_arn}")
-    if "FLIGHT_LAMBDA_ARN" not in env_content:
-        env_updates.append(f"FLIGHT_LAMBDA_ARN={flight_lambda_arn}")
-    if "COGNITO_USER_POOL_ID" not in env_content:
-        env_updates.append(f"COGNITO_USER_POOL_ID={cognito_user_pool_id}")
-    if "COGNITO_CLIENT_ID" not in env_content:
-        env_updates.append(f"COGNITO_CLIENT_ID={cognito_client_id}")
-    if "COGNITO_TEST_USERNAME" not in env_content:
-        env_updates.append(f"COGNITO_TEST_USERNAME={test_username}")
-    if "COGNITO_TEST_PASSWORD" not in env_content:
-        env_updates.append(f"COGNITO_TEST_PASSWORD={test_password}")
+    # Keys already defined (KEY=... at line start, comments ignored), parsed once
+    existing_keys = {
+        line.split("=", 1)[0].strip()
+        for line in env_content.splitlines()
+        if "=" in line and not line.strip().startswith("#")
+    }
+    candidates = {
+        "MCP_GATEWAY_URL": gateway_url,
+        "WEATHER_LAMBDA_ARN": weather_lambda_arn,
+        "FLIGHT_LAMBDA_ARN": flight_lambda_arn,
+        "COGNITO_USER_POOL_ID": cognito_user_pool_id,
+        "COGNITO_CLIENT_ID": cognito_client_id,
+        "COGNITO_TEST_USERNAME": test_username,
+        "COGNITO_TEST_PASSWORD": test_password,
+    }
+    env_updates = {k: v for k, v in candidates.items() if k not in existing_keys}
     
     if env_updates:
         with open(env_path, "a") as f:
             f.write("\n\n# MCP Gateway Configuration (Deployed)\n")
-            for update in env_updates:
-                f.write(f"{update}\n")
+            f.writelines(f"{k}={v}\n" for k, v in env_updates.items())
         print(f"✅ Added {len(env_updates)} configuration(s) to .env")
     else:
         print("✅ .env already up to date")
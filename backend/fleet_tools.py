@@ -1,9 +1,16 @@
-import json
-import pandas as pd
+import functools
+import orjson
+import os
+import threading
+import time
+from collections import Counter
 import requests
-from datetime import datetime
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from datetime import datetime, timedelta
 import boto3
-from boto3.dynamodb.conditions import Key, Attr
+from boto3.dynamodb.conditions import Key
+from botocore.config import Config
 from decimal import Decimal
 
 # Simple decorator replacement for when strands is not available
@@ -17,79 +24,216 @@ def decimal_default(obj):
         return float(obj)
     raise TypeError
 
-# Initialize DynamoDB
-dynamodb = boto3.resource('dynamodb')
-FLEET_TABLE = dynamodb.Table('hertz-fleet-inventory')
-
 
+def _to_float(items):
+    """Convert DynamoDB Decimal attributes to float in place, once per query result"""
+    for item in items:
+        for key, value in item.items():
+            if type(value) is Decimal:
+                item[key] = float(value)
+    return items
+
+
+def _dumps(obj, indent: bool = False) -> str:
+    """Serialize a tool response with orjson (query results are already float, see _to_float)"""
+    option = orjson.OPT_INDENT_2 if indent else 0
+    return orjson.dumps(obj, default=decimal_default, option=option).decode()
+
+# Initialize DynamoDB once at import so warm invocations reuse the table handle;
+# the pool is sized for concurrent tool calls and idle connections kept alive
+dynamodb = boto3.resource('dynamodb', config=Config(
+    max_pool_connections=50,
+    retries={'mode': 'adaptive', 'max_attempts': 5},
+    tcp_keepalive=True,
+))
+FLEET_TABLE = dynamodb.Table(os.environ.get('FLEET_TABLE_NAME', 'hertz-fleet-inventory'))
+
+# One HTTP session per process so Nager.Date and Ticketmaster calls reuse
+# pooled keep-alive connections instead of a new TCP+TLS handshake each time
+http = requests.Session()
+http.headers.update({"Connection": "keep-alive", "Accept-Encoding": "gzip"})
+http.mount("https://", HTTPAdapter(
+    pool_connections=16,
+    pool_maxsize=32,
+    max_retries=Retry(total=2, backoff_factor=0.2, status_forcelist=[429, 502, 503, 504]),
+))
+
+# Third-party API keys live in Secrets Manager; read once and refresh every 15 minutes.
+# The ARN comes from the HertzMcpStack output via deploy_agentcore_runtime.py, as for the Lambdas
+SECRETS_ARN = os.environ.get('SECRETS_ARN')
+secrets_client = boto3.client('secretsmanager')
+_api_keys = {"value": {}, "expires_at": 0.0}
+
+# Environment fallbacks for local runs, read once at import
+TICKETMASTER_API_KEY = os.getenv("TICKETMASTER_API_KEY", "")
+TICKETMASTER_EVENTS_URL = "https://app.ticketmaster.com/discovery/v2/events.json"
+
+
+def _get_api_key(name: str, fallback: str = "") -> str:
+    """Get an API key from the shared secret, falling back to the given default"""
+    if not SECRETS_ARN:
+        return fallback
+    now = time.monotonic()
+    if now >= _api_keys["expires_at"]:
+        try:
+            secret = secrets_client.get_secret_value(SecretId=SECRETS_ARN)
+            _api_keys["value"] = orjson.loads(secret["SecretString"])
+        except Exception as e:
+            print(f"Error reading API key secret: {e}")
+        _api_keys["expires_at"] = now + 900
+    return _api_keys["value"].get(name) or fallback
+
+
+# Fleet reads are cached briefly per runtime session; statuses only move on
+# rental/return so a short TTL keeps answers fresh while absorbing the
+# repeated lookups a single conversation makes
+FLEET_CACHE_TTL_SECONDS = int(os.environ.get('FLEET_CACHE_TTL_SECONDS', '60'))
+
+
+def _ttl_cache(seconds: int, maxsize: int = 1024):
+    """Cache non-empty results by arguments for `seconds`, evicting oldest first"""
+    def decorator(func):
+        cache = {}
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = cache.get(args)
+            if hit and now - hit[0] < seconds:
+                return hit[1]
+            result = func(*args)
+            if result:
+                with lock:  # the agent may run tools concurrently
+                    cache.pop(args, None)
+                    if len(cache) >= maxsize:
+                        cache.pop(next(iter(cache)))
+                    cache[args] = (now, result)
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
+
+
+@_ttl_cache(FLEET_CACHE_TTL_SECONDS)
 def _search_by_zip(zip_code: str, status: str = None):
     """Query DynamoDB by ZIP code using GSI"""
     try:
         if status:
             # Query with both partition and sort key
             response = FLEET_TABLE.query(
-                IndexName='zip_code-index',
+                IndexName='zip_code-index-v2',
                 KeyConditionExpression=Key('zip_code').eq(zip_code) & Key('status').eq(status)
             )
         else:
             # Query with just partition key
             response = FLEET_TABLE.query(
-                IndexName='zip_code-index',
+                IndexName='zip_code-index-v2',
                 KeyConditionExpression=Key('zip_code').eq(zip_code)
             )
         
-        return response.get('Items', [])
+        return _to_float(response.get('Items', []))
+    except Exception as e:
+        print(f"Error querying DynamoDB: {e}")
+        return []
+
+
+@_ttl_cache(FLEET_CACHE_TTL_SECONDS)
+def _summary_rows(zip_code: str):
+    """Only the attributes the summary aggregates, for every vehicle at a ZIP code"""
+    try:
+        rows = []
+        kwargs = {
+            'IndexName': 'zip_code-index-v2',
+            'KeyConditionExpression': Key('zip_code').eq(zip_code),
+            'ProjectionExpression': '#s, category, daily_rate, #l',
+            'ExpressionAttributeNames': {'#s': 'status', '#l': 'location'},
+        }
+        while True:
+            response = FLEET_TABLE.query(**kwargs)
+            rows.extend(response.get('Items', []))
+            if 'LastEvaluatedKey' not in response:
+                return _to_float(rows)
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
     except Exception as e:
         print(f"Error querying DynamoDB: {e}")
         return []
 
 
 def _get_summary(zip_code: str):
-    vehicles = _search_by_zip(zip_code)
+    vehicles = _summary_rows(zip_code)
     if not vehicles:
         return {"error": f"No vehicles found for {zip_code}"}
 
-    df = pd.DataFrame(vehicles)
+    # Single pass over the items
+    statuses = Counter()
+    categories = Counter()
+    total_rate = 0.0
+    for v in vehicles:
+        statuses[v["status"]] += 1
+        categories[v["category"]] += 1
+        total_rate += v["daily_rate"]
+
     return {
         "zip_code": zip_code,
         "location": vehicles[0]["location"],
         "total_vehicles": len(vehicles),
-        "available": len(df[df["status"] == "available"]),
-        "rented": len(df[df["status"] == "rented"]),
-        "maintenance": len(df[df["status"] == "maintenance"]),
-        "categories": df["category"].value_counts().to_dict(),
-        "avg_daily_rate": round(df["daily_rate"].mean(), 2),
+        "available": statuses["available"],
+        "rented": statuses["rented"],
+        "maintenance": statuses["maintenance"],
+        "categories": dict(categories.most_common()),
+        "avg_daily_rate": round(total_rate / len(vehicles), 2),
     }
 
 
+# Cross-location search reads at most this many matching vehicles
+SEARCH_LIMIT = 100
+
+
+@_ttl_cache(FLEET_CACHE_TTL_SECONDS)
 def _search_vehicles(make: str = None, model: str = None, category: str = None, status: str = None):
-    """Search vehicles across all locations by make, model, category, or status"""
-    try:
-        # Build filter expression
-        filter_expressions = []
-        
-        if make:
-            filter_expressions.append(Attr('make').contains(make.title()))
+    """Search vehicles across all locations by make, model or category, optionally filtered by status"""
+    # make_model-index is keyed on the lowercase make_key/model_key written by
+    # load_fleet_data.py, so "bmw", "BMW" and "Bmw" all match
+    make = make.strip().lower() if make else None
+    model = model.strip().lower() if model else None
+    category = category.strip().lower() if category else None
+
+    # Query the GSI of the most selective filter given, the rest are applied here
+    if make:
+        index, key = 'make_model-index', Key('make_key').eq(make)
         if model:
-            filter_expressions.append(Attr('model').contains(model.title()))
-        if category:
-            filter_expressions.append(Attr('category').eq(category.lower()))
-        if status:
-            filter_expressions.append(Attr('status').eq(status))
-        
-        # Scan with filters (for cross-location search)
-        if filter_expressions:
-            filter_expr = filter_expressions[0]
-            for expr in filter_expressions[1:]:
-                filter_expr = filter_expr & expr
-            
-            response = FLEET_TABLE.scan(FilterExpression=filter_expr, Limit=100)
-        else:
-            response = FLEET_TABLE.scan(Limit=100)
-        
-        return response.get('Items', [])
+            key = key & Key('model_key').begins_with(model)
+    elif category:
+        index, key = 'category-index', Key('category').eq(category)
+    else:
+        # Status alone has three values, so it is only ever a filter
+        return []
+
+    def matches(v):
+        return ((not make or v['make'].lower() == make)
+                and (not model or v['model'].lower().startswith(model))
+                and (not category or v['category'] == category)
+                and (not status or v['status'] == status))
+
+    try:
+        vehicles = []
+        kwargs = {'IndexName': index, 'KeyConditionExpression': key}
+        while len(vehicles) < SEARCH_LIMIT:
+            response = FLEET_TABLE.query(**kwargs)
+            vehicles.extend(v for v in response.get('Items', []) if matches(v))
+            if 'LastEvaluatedKey' not in response:
+                break
+            kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        vehicles = vehicles[:SEARCH_LIMIT]
+        for v in vehicles:
+            # Index keys only; the display make/model are already in the item
+            v.pop('make_key', None)
+            v.pop('model_key', None)
+        return _to_float(vehicles)
     except Exception as e:
-        print(f"Error scanning DynamoDB: {e}")
+        print(f"Error querying DynamoDB: {e}")
         return []
 
 
@@ -110,16 +254,15 @@ def search_fleet_by_zip(zip_code: str, status: str = None) -> str:
     vehicles = _search_by_zip(zip_code, status)
 
     if not vehicles:
-        return json.dumps({"message": f"No vehicles found for {zip_code}", "vehicles": []})
+        return _dumps({"message": f"No vehicles found for {zip_code}", "vehicles": []})
 
-    return json.dumps(
+    return _dumps(
         {
             "zip_code": zip_code,
             "location": vehicles[0]["location"],
             "count": len(vehicles),
             "vehicles": vehicles,
-        },
-        default=decimal_default
+        }
     )
 
 
@@ -142,9 +285,19 @@ def search_vehicles_general(make: str = None, model: str = None, category: str =
         category: Vehicle category (e.g., 'Sedan', 'SUV', 'Sports', 'Electric')
         status: Optional status filter ('available', 'rented', 'maintenance')
 
+    At least one of make or category is required; pass the make along
+    with a model (e.g., make='Toyota', model='Camry').
+
     Returns:
         JSON with matching vehicles across all locations
     """
+    if not (make or category):
+        # Without an indexed filter this would be a full-table scan
+        return _dumps({
+            "error": "specify at least one filter: make or category",
+            "vehicles": []
+        })
+
     vehicles = _search_vehicles(make, model, category, status)
 
     if not vehicles:
@@ -158,27 +311,23 @@ def search_vehicles_general(make: str = None, model: str = None, category: str =
         if status:
             search_terms.append(f"status: {status}")
         
-        return json.dumps({
+        return _dumps({
             "message": f"No vehicles found matching {', '.join(search_terms)}",
             "vehicles": []
         })
 
-    # Group by location for better presentation
+    # Group by location for better presentation; the grouped view is the only
+    # copy sent, a flat list alongside it would double the payload
     locations = {}
     for v in vehicles:
-        loc = v["location"]
-        if loc not in locations:
-            locations[loc] = []
-        locations[loc].append(v)
+        locations.setdefault(v["location"], []).append(v)
 
-    return json.dumps(
+    return _dumps(
         {
             "count": len(vehicles),
             "locations_found": len(locations),
-            "vehicles": vehicles,
             "by_location": locations,
-        },
-        default=decimal_default
+        }
     )
 
 
@@ -193,7 +342,20 @@ def get_fleet_summary(zip_code: str) -> str:
     Returns:
         JSON with fleet statistics
     """
-    return json.dumps(_get_summary(zip_code), default=decimal_default)
+    return _dumps(_get_summary(zip_code))
+
+
+# Public holidays for a year only change when Nager.Date corrects its data
+HOLIDAYS_CACHE_TTL_SECONDS = 30 * 24 * 3600
+
+
+@_ttl_cache(HOLIDAYS_CACHE_TTL_SECONDS, maxsize=8)
+def _fetch_holidays(year: int):
+    """Fetch U.S. public holidays for a year from Nager.Date"""
+    url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/US"
+    response = http.get(url, timeout=5)
+    response.raise_for_status()
+    return tuple(orjson.loads(response.content))
 
 
 @tool
@@ -216,16 +378,13 @@ def get_national_holidays(year: int = None, month: int = None) -> str:
         if year is None:
             year = datetime.now().year
         
-        # Call Nager.Date API for US holidays
-        url = f"https://date.nager.at/api/v3/PublicHolidays/{year}/US"
-        response = requests.get(url, timeout=5)
-        response.raise_for_status()
-        
-        holidays = response.json()
+        # Call Nager.Date API for US holidays (cached per year)
+        holidays = _fetch_holidays(year)
         
-        # Filter by month if specified
+        # Filter by month if specified (dates are always YYYY-MM-DD)
         if month is not None:
-            holidays = [h for h in holidays if datetime.fromisoformat(h['date']).month == month]
+            mm = f"{int(month):02d}"
+            holidays = [h for h in holidays if h['date'][5:7] == mm]
         
         # Format for better readability
         formatted_holidays = []
@@ -239,25 +398,110 @@ def get_national_holidays(year: int = None, month: int = None) -> str:
                 "types": holiday.get('types', [])
             })
         
-        return json.dumps({
+        return _dumps({
             "year": year,
             "month": month if month else "all",
             "count": len(formatted_holidays),
             "holidays": formatted_holidays
-        }, indent=2)
+        }, indent=True)
     
     except requests.RequestException as e:
-        return json.dumps({
+        return _dumps({
             "error": f"Failed to fetch holidays: {str(e)}",
             "holidays": []
         })
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             "error": f"Error: {str(e)}",
             "holidays": []
         })
 
 
+# Ticketmaster listings for a ZIP and date window are reused for 10 minutes
+EVENTS_CACHE_TTL_SECONDS = 600
+
+# Read-only fallbacks for absent Ticketmaster fields
+_EMPTY = {}
+_NO_CLASSIFICATIONS = (_EMPTY,)
+
+# Events are returned as rows under one shared header rather than one dict per
+# event, so field names are not repeated for every event sent to the agent
+EVENT_COLUMNS = (
+    "name", "date", "time", "type", "genre",
+    "venue", "city", "state", "address", "url", "priceRanges",
+)
+
+
+@_ttl_cache(EVENTS_CACHE_TTL_SECONDS, maxsize=256)
+def _fetch_events(zip_code: str, start_date: str = None, end_date: str = None, size: int = 20):
+    """Fetch and format Ticketmaster events; failures raise and are not cached"""
+    # Set default dates if not provided
+    if start_date is None:
+        start_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
+    else:
+        start_date = f"{start_date}T00:00:00Z"
+    
+    if end_date is None:
+        # Default to 30 days from start
+        end_dt = datetime.now() + timedelta(days=30)
+        end_date = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
+    else:
+        end_date = f"{end_date}T23:59:59Z"
+    
+    # Call Ticketmaster Discovery API
+    params = {
+        "apikey": _get_api_key("ticketmaster", TICKETMASTER_API_KEY),
+        "postalCode": zip_code,
+        "countryCode": "US",
+        "startDateTime": start_date,
+        "endDateTime": end_date,
+        "size": min(size, 200),  # Cap at 200
+        "sort": "date,asc"
+    }
+    
+    response = http.get(TICKETMASTER_EVENTS_URL, params=params, timeout=10)
+    response.raise_for_status()
+    
+    data = orjson.loads(response.content)
+    
+    # Check if events exist
+    if "_embedded" not in data or "events" not in data["_embedded"]:
+        return {"events": [], "page": data.get("page", {})}
+    
+    events = data["_embedded"]["events"]
+    
+    # Format events as rows under EVENT_COLUMNS; missing sub-objects fall back
+    # to the shared empty dict instead of allocating a fresh {} per lookup
+    rows = []
+    for event in events:
+        get = event.get
+        
+        # Extract venue info
+        venues = (get("_embedded") or _EMPTY).get("venues")
+        venue = venues[0] if venues else _EMPTY
+        venue_get = venue.get
+        
+        # Extract date and classification info
+        start_info = (get("dates") or _EMPTY).get("start") or _EMPTY
+        classification = (get("classifications") or _NO_CLASSIFICATIONS)[0]
+        
+        rows.append((
+            get("name", "Unknown"),
+            start_info.get("localDate", "Unknown"),
+            start_info.get("localTime", "TBD"),
+            (classification.get("segment") or _EMPTY).get("name", "Unknown"),
+            (classification.get("genre") or _EMPTY).get("name", "Unknown"),
+            venue_get("name", "Unknown"),
+            (venue_get("city") or _EMPTY).get("name", "Unknown"),
+            (venue_get("state") or _EMPTY).get("stateCode", "Unknown"),
+            (venue_get("address") or _EMPTY).get("line1", "Unknown"),
+            get("url", ""),
+            get("priceRanges", []),
+        ))
+    
+    return {"events": rows, "page": data.get("page", {})}
+
+
 @tool
 def get_local_events(zip_code: str, start_date: str = None, end_date: str = None, size: int = 20) -> str:
     """
@@ -273,110 +517,41 @@ def get_local_events(zip_code: str, start_date: str = None, end_date: str = None
         size: Number of events to return (default 20, max 200)
 
     Returns:
-        JSON with list of upcoming events including name, date, venue, and type
+        JSON with upcoming events as rows (name, date, time, type, genre, venue,
+        city, state, address, url, priceRanges) described by "columns"
     """
     try:
-        import os
-        
-        # Get API key from environment
-        api_key = os.getenv("TICKETMASTER_API_KEY")
+        api_key = _get_api_key("ticketmaster", TICKETMASTER_API_KEY)
         if not api_key:
-            return json.dumps({
-                "error": "Ticketmaster API key not configured. Set TICKETMASTER_API_KEY environment variable.",
+            return _dumps({
+                "error": "Ticketmaster API key not configured. Set TICKETMASTER_API_KEY and re-run deploy_gateway.py.",
                 "events": []
             })
         
-        # Set default dates if not provided
-        if start_date is None:
-            start_date = datetime.now().strftime("%Y-%m-%dT%H:%M:%SZ")
-        else:
-            start_date = f"{start_date}T00:00:00Z"
-        
-        if end_date is None:
-            # Default to 30 days from start
-            end_dt = datetime.now() + pd.Timedelta(days=30)
-            end_date = end_dt.strftime("%Y-%m-%dT%H:%M:%SZ")
-        else:
-            end_date = f"{end_date}T23:59:59Z"
-        
-        # Call Ticketmaster Discovery API
-        url = "https://app.ticketmaster.com/discovery/v2/events.json"
-        params = {
-            "apikey": api_key,
-            "postalCode": zip_code,
-            "countryCode": "US",
-            "startDateTime": start_date,
-            "endDateTime": end_date,
-            "size": min(size, 200),  # Cap at 200
-            "sort": "date,asc"
-        }
-        
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        # Check if events exist
-        if "_embedded" not in data or "events" not in data["_embedded"]:
-            return json.dumps({
+        events = _fetch_events(zip_code, start_date, end_date, size)
+        if not events["events"]:
+            return _dumps({
                 "zip_code": zip_code,
                 "count": 0,
                 "events": [],
                 "message": f"No events found for ZIP code {zip_code}"
             })
         
-        events = data["_embedded"]["events"]
-        
-        # Format events for better readability
-        formatted_events = []
-        for event in events:
-            # Extract venue info
-            venue_info = {}
-            if "_embedded" in event and "venues" in event["_embedded"]:
-                venue = event["_embedded"]["venues"][0]
-                venue_info = {
-                    "name": venue.get("name", "Unknown"),
-                    "city": venue.get("city", {}).get("name", "Unknown"),
-                    "state": venue.get("state", {}).get("stateCode", "Unknown"),
-                    "address": venue.get("address", {}).get("line1", "Unknown")
-                }
-            
-            # Extract date info
-            dates = event.get("dates", {})
-            start_info = dates.get("start", {})
-            event_date = start_info.get("localDate", "Unknown")
-            event_time = start_info.get("localTime", "TBD")
-            
-            # Extract classifications
-            classifications = event.get("classifications", [{}])[0]
-            segment = classifications.get("segment", {}).get("name", "Unknown")
-            genre = classifications.get("genre", {}).get("name", "Unknown")
-            
-            formatted_events.append({
-                "name": event.get("name", "Unknown"),
-                "date": event_date,
-                "time": event_time,
-                "type": segment,
-                "genre": genre,
-                "venue": venue_info,
-                "url": event.get("url", ""),
-                "priceRanges": event.get("priceRanges", [])
-            })
-        
-        return json.dumps({
+        return _dumps({
             "zip_code": zip_code,
-            "count": len(formatted_events),
-            "events": formatted_events,
-            "page": data.get("page", {})
-        }, indent=2)
+            "count": len(events["events"]),
+            "columns": EVENT_COLUMNS,
+            "events": events["events"],
+            "page": events["page"]
+        })
     
     except requests.RequestException as e:
-        return json.dumps({
+        return _dumps({
             "error": f"Failed to fetch events: {str(e)}",
             "events": []
         })
     except Exception as e:
-        return json.dumps({
+        return _dumps({
             "error": f"Error: {str(e)}",
             "events": []
         })
@@ -3,30 +3,34 @@ AWS Lambda function for flight traffic tool
 Designed to work with Amazon Bedrock AgentCore Gateway
 """
 import json
-import urllib.request
-import urllib.error
 import urllib.parse
+import urllib3
 import os
 from typing import Dict, Any
 
+from common import get_tool_name, get_named_parameter, get_json, get_secret, ttl_cache, run_batch
 
-def get_tool_name(context) -> str:
-    """Extract tool name from Lambda context (AgentCore Gateway passes it here)"""
-    try:
-        # AgentCore Gateway passes the tool name in the context
-        extended_tool_name = context.client_context.custom.get("bedrockAgentCoreToolName", "")
-        # The tool name format is "TargetName___tool_name"
-        if "___" in extended_tool_name:
-            return extended_tool_name.split("___")[1]
-        return extended_tool_name
-    except (AttributeError, KeyError):
-        return ""
+# Tool answers are stable for minutes; serve repeats from the warm container
+CACHE_TTL_SECONDS = int(os.environ.get("TOOL_CACHE_TTL_SECONDS", "600"))
+
+# Key configuration is fixed for the container's lifetime, read once at cold start
+SECRETS_ARN = os.environ.get("SECRETS_ARN")
+AVIATIONSTACK_API_KEY = os.environ.get("AVIATIONSTACK_API_KEY", "")
+# The free AviationStack plan only serves plain HTTP; paid plans should point
+# this at the https:// endpoint. Responses are gzip-compressed either way (common.HTTP)
+AVIATIONSTACK_FLIGHTS_URL = os.environ.get(
+    "AVIATIONSTACK_FLIGHTS_URL", "http://api.aviationstack.com/v1/flights"
+)
 
 
-def get_named_parameter(event: Dict[str, Any], name: str) -> Any:
-    """Extract named parameter from Lambda event"""
-    # AgentCore Gateway passes parameters directly in the event
-    return event.get(name)
+def get_api_key() -> str:
+    """AviationStack key from Secrets Manager, falling back to the environment for local runs"""
+    if SECRETS_ARN:
+        try:
+            return get_secret(SECRETS_ARN).get("aviationstack", "")
+        except Exception as e:
+            print(f"Error reading API key secret: {e}")
+    return AVIATIONSTACK_API_KEY
 
 
 def get_flight_traffic(airport_code: str) -> Dict[str, Any]:
@@ -39,12 +43,17 @@ def get_flight_traffic(airport_code: str) -> Dict[str, Any]:
     Returns:
         Dictionary with flight arrival and departure information
     """
-    # Get API key from environment variable
-    api_key = os.environ.get("AVIATIONSTACK_API_KEY")
+    # Normalize before the cache so "lax", " LAX" and "LAX" share one entry
+    return _flight_traffic(airport_code.strip().upper())
+
+
+@ttl_cache(CACHE_TTL_SECONDS)
+def _flight_traffic(airport_code: str) -> Dict[str, Any]:
+    api_key = get_api_key()
     
     if not api_key or api_key == "your_aviationstack_api_key_here":
         return {
-            "error": "AviationStack API key not configured. Please add AVIATIONSTACK_API_KEY to Lambda environment",
+            "error": "AviationStack API key not configured. Please set AVIATIONSTACK_API_KEY and re-run deploy_gateway.py",
             "airport": airport_code.upper(),
             "note": "Get a free API key at https://aviationstack.com/",
             "flights": []
@@ -58,10 +67,9 @@ def get_flight_traffic(airport_code: str) -> Dict[str, Any]:
             "limit": 10
         })
         
-        url = f"http://api.aviationstack.com/v1/flights?{params}"
+        url = f"{AVIATIONSTACK_FLIGHTS_URL}?{params}"
         
-        with urllib.request.urlopen(url, timeout=10) as response:
-            data = json.loads(response.read().decode())
+        data = get_json(url, timeout=10.0)
         
         if "error" in data:
             return {
@@ -91,7 +99,7 @@ def get_flight_traffic(airport_code: str) -> Dict[str, Any]:
             "note": "Showing recent/upcoming arrivals. High arrival count indicates increased rental demand."
         }
     
-    except urllib.error.URLError as e:
+    except urllib3.exceptions.HTTPError as e:
         return {
             "error": f"Failed to fetch flight data: {str(e)}",
             "airport": airport_code.upper(),
@@ -105,6 +113,14 @@ def get_flight_traffic(airport_code: str) -> Dict[str, Any]:
         }
 
 
+def _traffic_for_query(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Flight traffic for one entry of a batched request"""
+    airport_code = query.get("airport_code")
+    if not airport_code:
+        return {"error": "airport_code is required"}
+    return get_flight_traffic(airport_code)
+
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler for AgentCore Gateway
@@ -121,6 +137,15 @@ def lambda_handler(event, context):
         print(f"Extracted tool name: {tool_name}")
         
         if tool_name == "get_flight_traffic":
+            queries = get_named_parameter(event, "queries")
+            if queries:
+                # Batch of airports: fetch concurrently, report failures per item
+                results = run_batch(_traffic_for_query, queries)
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps({"results": results})
+                }
+            
             airport_code = get_named_parameter(event, "airport_code")
             
             if not airport_code:
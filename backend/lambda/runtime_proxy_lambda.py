@@ -2,52 +2,76 @@
 Lambda function to proxy requests from React app to AgentCore Runtime
 This enables the React app to use all AgentCore features including MCP tools
 """
-import json
+import base64
+import gzip
 import os
+import time
 import boto3
+import orjson
+from botocore.config import Config
 
-# Initialize clients
+# Initialize clients once per container so warm invocations reuse them
+# (and their keep-alive connections) instead of rebuilding per request
 # AWS_REGION is automatically set by Lambda runtime
 region = os.environ['AWS_REGION']
-cognito_client = boto3.client('cognito-idp', region_name=region)
+client_config = Config(
+    max_pool_connections=32,
+    tcp_keepalive=True,
+    retries={'mode': 'adaptive'},
+)
+agentcore_client = boto3.client('bedrock-agentcore', region_name=region, config=client_config)
+ssm_client = boto3.client('ssm', region_name=region, config=client_config)
 
 # Runtime configuration
-COGNITO_USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID')
-COGNITO_CLIENT_ID = os.environ.get('COGNITO_CLIENT_ID')
-TEST_USERNAME = os.environ.get('COGNITO_TEST_USERNAME', 'test-user')
-TEST_PASSWORD = os.environ.get('COGNITO_TEST_PASSWORD')
 RUNTIME_ARN = os.environ.get('STRANDS_RUNTIME_ARN')
+RUNTIME_ARN_PARAMETER = os.environ.get('STRANDS_RUNTIME_ARN_PARAMETER', '/hertz/agentcore/strands_runtime_arn')
+PARAMETER_MAX_AGE = int(os.environ.get('PARAMETER_MAX_AGE', '300'))
 
+# SSM values cached across warm invocations: {name: (value, fetched_at)}
+_parameter_cache = {}
 
-def get_cognito_token():
-    """Get Cognito access token for runtime authentication"""
+
+def get_ssm_parameter(name, max_age=PARAMETER_MAX_AGE):
+    """Get an SSM parameter, reusing the cached value for up to max_age seconds"""
+    cached = _parameter_cache.get(name)
+    now = time.time()
+    if cached and now - cached[1] < max_age:
+        return cached[0]
+    value = ssm_client.get_parameter(Name=name)['Parameter']['Value']
+    _parameter_cache[name] = (value, now)
+    return value
+
+
+def get_runtime_arn():
+    """Runtime ARN from the environment override, else from SSM"""
+    return RUNTIME_ARN or get_ssm_parameter(RUNTIME_ARN_PARAMETER)
+
+
+def prime():
+    """Load the SSM client and resolve the runtime ARN before the snapshot is taken"""
     try:
-        auth_response = cognito_client.admin_initiate_auth(
-            UserPoolId=COGNITO_USER_POOL_ID,
-            ClientId=COGNITO_CLIENT_ID,
-            AuthFlow='ADMIN_USER_PASSWORD_AUTH',
-            AuthParameters={
-                'USERNAME': TEST_USERNAME,
-                'PASSWORD': TEST_PASSWORD,
-            },
-        )
-        return auth_response['AuthenticationResult']['AccessToken']
+        get_runtime_arn()
     except Exception as e:
-        print(f'Error getting Cognito token: {e}')
-        return None
+        print(f'Priming failed (continuing): {e}')
 
 
-def invoke_runtime(prompt, token):
+# SnapStart runs INIT once per published version, so prime before the snapshot
+# is taken and every restored environment starts with loaded clients. Cached
+# SSM values expire by wall-clock time, so a stale snapshot refetches them.
+try:
+    from snapshot_restore_py import register_before_snapshot
+    register_before_snapshot(prime)
+except ImportError:
+    pass
+
+
+def invoke_runtime(prompt):
     """Invoke AgentCore Runtime using boto3 with IAM auth (no HTTP/bearer token needed)"""
     try:
-        import json
         import uuid
         
-        # Use boto3 bedrock-agentcore client with IAM credentials
-        # This works from Lambda without needing internet access
-        client = boto3.client('bedrock-agentcore', region_name=region)
-        
-        runtime_id = RUNTIME_ARN.split('/')[-1]
+        runtime_arn = get_runtime_arn()
+        runtime_id = runtime_arn.split('/')[-1]
         session_id = str(uuid.uuid4())
         
         print(f"Invoking runtime: {runtime_id}")
@@ -56,17 +80,20 @@ def invoke_runtime(prompt, token):
         
         # Invoke using boto3 SDK (uses IAM auth, not bearer token)
         # Parameters based on bedrock-agentcore API
-        response = client.invoke_agent_runtime(
-            agentRuntimeArn=RUNTIME_ARN,
-            payload=json.dumps({"prompt": prompt}),
+        response = agentcore_client.invoke_agent_runtime(
+            agentRuntimeArn=runtime_arn,
+            payload=orjson.dumps({"prompt": prompt}),
             runtimeSessionId=session_id
         )
         
         # Extract response from the streaming body
-        if 'response' in response and hasattr(response['response'], 'read'):
-            # It's a StreamingBody object
-            response_bytes = response['response'].read()
-            response_data = json.loads(response_bytes.decode('utf-8'))
+        if 'response' in response and hasattr(response['response'], 'iter_chunks'):
+            # It's a StreamingBody object: drain it in 64 KiB chunks into one
+            # buffer and decode once
+            response_bytes = bytearray()
+            for chunk in response['response'].iter_chunks(chunk_size=64 * 1024):
+                response_bytes.extend(chunk)
+            response_data = orjson.loads(response_bytes)
             # Check if response_data is a dict or string
             if isinstance(response_data, dict):
                 response_text = response_data.get('response', str(response_data))
@@ -103,6 +130,34 @@ def invoke_runtime(prompt, token):
         return None
 
 
+# Bodies smaller than this are sent as-is; gzip framing would outweigh the savings
+GZIP_MIN_BYTES = 1024
+
+
+def accepts_gzip(event):
+    """True if the client sent Accept-Encoding with gzip (header names vary in case)"""
+    headers = event.get('headers') or {}
+    accept = headers.get('accept-encoding') or headers.get('Accept-Encoding') or ''
+    return 'gzip' in accept
+
+
+def json_response(status_code, payload, headers, gzip_ok=False):
+    """API Gateway proxy response, gzip-compressed when the client allows it"""
+    body = orjson.dumps(payload)
+    if gzip_ok and len(body) >= GZIP_MIN_BYTES:
+        return {
+            'statusCode': status_code,
+            'headers': {**headers, 'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding'},
+            'body': base64.b64encode(gzip.compress(body, compresslevel=6)).decode(),
+            'isBase64Encoded': True,
+        }
+    return {
+        'statusCode': status_code,
+        'headers': headers,
+        'body': body.decode(),
+    }
+
+
 def lambda_handler(event, context):
     """Lambda handler for API Gateway requests"""
     
@@ -114,8 +169,9 @@ def lambda_handler(event, context):
         'Access-Control-Allow-Methods': 'POST,OPTIONS'
     }
     
-    # Handle OPTIONS request for CORS preflight
-    if event.get('httpMethod') == 'OPTIONS':
+    # Handle OPTIONS request for CORS preflight (REST payload v1 or HTTP API payload v2)
+    method = event.get('httpMethod') or event.get('requestContext', {}).get('http', {}).get('method')
+    if method == 'OPTIONS':
         return {
             'statusCode': 200,
             'headers': cors_headers,
@@ -124,39 +180,30 @@ def lambda_handler(event, context):
     
     try:
         # Parse request body
-        body = json.loads(event.get('body', '{}'))
+        raw_body = event.get('body') or '{}'
+        if event.get('isBase64Encoded'):
+            raw_body = base64.b64decode(raw_body).decode('utf-8')
+        body = orjson.loads(raw_body)
         prompt = body.get('prompt', '')
         
         if not prompt:
             return {
                 'statusCode': 400,
                 'headers': cors_headers,
-                'body': json.dumps({'error': 'No prompt provided'})
-            }
-        
-        # Get Cognito token
-        token = get_cognito_token()
-        if not token:
-            return {
-                'statusCode': 500,
-                'headers': cors_headers,
-                'body': json.dumps({'error': 'Failed to authenticate'})
+                'body': orjson.dumps({'error': 'No prompt provided'}).decode()
             }
         
         # Invoke runtime
-        response_text = invoke_runtime(prompt, token)
+        response_text = invoke_runtime(prompt)
         
         if response_text:
-            return {
-                'statusCode': 200,
-                'headers': cors_headers,
-                'body': json.dumps({'response': response_text})
-            }
+            # Agent answers run to several KB of text; compress them on the way out
+            return json_response(200, {'response': response_text}, cors_headers, accepts_gzip(event))
         else:
             return {
                 'statusCode': 500,
                 'headers': cors_headers,
-                'body': json.dumps({'error': 'Failed to get response from runtime'})
+                'body': orjson.dumps({'error': 'Failed to get response from runtime'}).decode()
             }
     
     except Exception as e:
@@ -166,5 +213,5 @@ def lambda_handler(event, context):
         return {
             'statusCode': 500,
             'headers': cors_headers,
-            'body': json.dumps({'error': str(e)})
+            'body': orjson.dumps({'error': str(e)}).decode()
         }
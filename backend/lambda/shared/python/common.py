@@ -0,0 +1,115 @@
+"""
+Shared helpers for AgentCore Gateway Lambda tools
+Published as a Lambda layer and imported by weather_lambda and flight_lambda
+"""
+import functools
+import json
+import os
+import threading
+import time
+import urllib3
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Any, Callable, List
+
+# Secrets are fetched once per container and refreshed after max_age seconds
+_secrets_client = None
+_secret_cache = {}  # secret_id -> (value, expires_at)
+
+
+def get_tool_name(context) -> str:
+    """Extract tool name from Lambda context (AgentCore Gateway passes it here)"""
+    try:
+        # AgentCore Gateway passes the tool name in the context
+        extended_tool_name = context.client_context.custom.get("bedrockAgentCoreToolName", "")
+        # The tool name format is "TargetName___tool_name"
+        if "___" in extended_tool_name:
+            return extended_tool_name.split("___")[1]
+        return extended_tool_name
+    except (AttributeError, KeyError):
+        return ""
+
+
+def get_named_parameter(event: Dict[str, Any], name: str) -> Any:
+    """Extract named parameter from Lambda event"""
+    # AgentCore Gateway passes parameters directly in the event
+    return event.get(name)
+
+
+# One connection pool per container, shared by every tool in it: warm
+# invocations reuse keep-alive connections instead of paying TCP+TLS setup.
+# maxsize matches run_batch's default worker count
+HTTP = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=10,
+    retries=urllib3.Retry(2, backoff_factor=0.2),
+    headers={"Accept-Encoding": "gzip"},
+)
+
+
+def get_json(url: str, timeout: float) -> Any:
+    """GET a URL on the shared pool and decode the JSON body"""
+    response = HTTP.request("GET", url, timeout=timeout)
+    if response.status >= 400:
+        raise urllib3.exceptions.HTTPError(f"HTTP {response.status} from {url.split('?')[0]}")
+    return json.loads(response.data)
+
+
+def get_secret(secret_id: str, max_age: int = 900) -> Dict[str, Any]:
+    """Read a JSON secret from Secrets Manager, cached for max_age seconds"""
+    global _secrets_client
+    now = time.monotonic()
+    cached = _secret_cache.get(secret_id)
+    if cached and cached[1] > now:
+        return cached[0]
+    if _secrets_client is None:
+        import boto3  # only tools that read secrets pay for the import
+        _secrets_client = boto3.client("secretsmanager", region_name=os.environ.get("AWS_REGION"))
+    value = json.loads(_secrets_client.get_secret_value(SecretId=secret_id)["SecretString"])
+    _secret_cache[secret_id] = (value, now + max_age)
+    return value
+
+
+def ttl_cache(seconds: int, maxsize: int = 256):
+    """
+    Cache a tool function's results for `seconds` within a warm Lambda container.
+    
+    Results carrying an "error" key are not cached so failures are retried.
+    """
+    def decorator(func):
+        cache = {}  # args -> (value, expires_at), oldest first
+        lock = threading.Lock()
+
+        @functools.wraps(func)
+        def wrapper(*args):
+            now = time.monotonic()
+            hit = cache.get(args)
+            if hit and hit[1] > now:
+                return hit[0]
+            value = func(*args)
+            if not (isinstance(value, dict) and "error" in value):
+                with lock:  # batched requests fill the cache from worker threads
+                    cache.pop(args, None)
+                    if len(cache) >= maxsize:
+                        cache.pop(next(iter(cache)))
+                    cache[args] = (value, now + seconds)
+            return value
+        return wrapper
+    return decorator
+
+
+def run_batch(func: Callable[[Dict[str, Any]], Dict[str, Any]], queries: List[Dict[str, Any]],
+              max_workers: int = 10) -> List[Dict[str, Any]]:
+    """
+    Run `func` over each query concurrently and return results in query order.
+    
+    A failing item is reported in place with an "error" field so the rest of
+    the batch still comes back (partial batch response).
+    """
+    def run_one(query):
+        try:
+            return func(query)
+        except Exception as e:
+            return {"error": f"Error: {str(e)}"}
+
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(queries)) or 1) as executor:
+        return list(executor.map(run_one, queries))
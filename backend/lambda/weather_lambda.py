@@ -3,29 +3,46 @@ AWS Lambda function for weather forecast tool
 Designed to work with Amazon Bedrock AgentCore Gateway
 """
 import json
-import urllib.request
-import urllib.error
 import urllib.parse
+import urllib3
+import os
+import threading
 from typing import Dict, Any
 
+from common import get_tool_name, get_named_parameter, get_json, ttl_cache, run_batch
 
-def get_tool_name(context) -> str:
-    """Extract tool name from Lambda context (AgentCore Gateway passes it here)"""
-    try:
-        # AgentCore Gateway passes the tool name in the context
-        extended_tool_name = context.client_context.custom.get("bedrockAgentCoreToolName", "")
-        # The tool name format is "TargetName___tool_name"
-        if "___" in extended_tool_name:
-            return extended_tool_name.split("___")[1]
-        return extended_tool_name
-    except (AttributeError, KeyError):
-        return ""
+# Tool answers are stable for minutes; serve repeats from the warm container
+CACHE_TTL_SECONDS = int(os.environ.get("TOOL_CACHE_TTL_SECONDS", "600"))
 
+# Coordinates never change, so geocoding results are kept for the container's
+# lifetime (FIFO-bounded) and a repeat location skips straight to the forecast
+GEOCODE_CACHE_SIZE = 512
+_GEOCODE_CACHE = {}  # normalized location -> (latitude, longitude, name)
+_GEOCODE_LOCK = threading.Lock()  # run_batch geocodes from worker threads
 
-def get_named_parameter(event: Dict[str, Any], name: str) -> Any:
-    """Extract named parameter from Lambda event"""
-    # AgentCore Gateway passes parameters directly in the event
-    return event.get(name)
+
+def geocode(location: str):
+    """Resolve a location name to (latitude, longitude, name), or None if not found"""
+    location = location.strip().casefold()
+    with _GEOCODE_LOCK:
+        cached = _GEOCODE_CACHE.get(location)
+    if cached:
+        return cached
+    
+    # Use Open-Meteo Geocoding API to get coordinates
+    geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={urllib.parse.quote(location)}&count=1&language=en&format=json"
+    geo_data = get_json(geocode_url, timeout=5.0)
+    
+    if not geo_data.get("results"):
+        return None
+    
+    result = geo_data["results"][0]
+    coordinates = (result["latitude"], result["longitude"], result["name"])
+    with _GEOCODE_LOCK:
+        if location not in _GEOCODE_CACHE and len(_GEOCODE_CACHE) >= GEOCODE_CACHE_SIZE:
+            _GEOCODE_CACHE.pop(next(iter(_GEOCODE_CACHE)), None)
+        _GEOCODE_CACHE[location] = coordinates
+    return coordinates
 
 
 def get_weather_forecast(location: str, days: int = 7) -> Dict[str, Any]:
@@ -39,27 +56,25 @@ def get_weather_forecast(location: str, days: int = 7) -> Dict[str, Any]:
     Returns:
         Dictionary with weather forecast data
     """
+    # Normalize before the cache so "Los Angeles" / "los angeles " and days=16 / days=30 share entries
+    return _weather_forecast(location.strip().casefold(), max(1, min(int(days or 7), 16)))
+
+
+@ttl_cache(CACHE_TTL_SECONDS)
+def _weather_forecast(location: str, days: int) -> Dict[str, Any]:
     try:
-        # Use Open-Meteo Geocoding API to get coordinates
-        geocode_url = f"https://geocoding-api.open-meteo.com/v1/search?name={urllib.parse.quote(location)}&count=1&language=en&format=json"
-        with urllib.request.urlopen(geocode_url, timeout=5) as response:
-            geo_data = json.loads(response.read().decode())
-        
-        if not geo_data.get("results"):
+        coordinates = geocode(location)
+        if not coordinates:
             return {
                 "error": f"Location '{location}' not found",
                 "forecast": []
             }
         
-        result = geo_data["results"][0]
-        lat = result["latitude"]
-        lon = result["longitude"]
-        location_name = result["name"]
+        lat, lon, location_name = coordinates
         
         # Get weather forecast from Open-Meteo
-        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,weathercode&temperature_unit=fahrenheit&timezone=auto&forecast_days={min(days, 16)}"
-        with urllib.request.urlopen(weather_url, timeout=5) as response:
-            weather_data = json.loads(response.read().decode())
+        weather_url = f"https://api.open-meteo.com/v1/forecast?latitude={lat}&longitude={lon}&daily=temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max,weathercode&temperature_unit=fahrenheit&timezone=auto&forecast_days={days}"
+        weather_data = get_json(weather_url, timeout=5.0)
         
         # Format forecast
         daily = weather_data["daily"]
@@ -82,7 +97,7 @@ def get_weather_forecast(location: str, days: int = 7) -> Dict[str, Any]:
             "forecast": forecast
         }
     
-    except urllib.error.URLError as e:
+    except urllib3.exceptions.HTTPError as e:
         return {
             "error": f"Failed to fetch weather: {str(e)}",
             "forecast": []
@@ -94,6 +109,14 @@ def get_weather_forecast(location: str, days: int = 7) -> Dict[str, Any]:
         }
 
 
+def _forecast_for_query(query: Dict[str, Any]) -> Dict[str, Any]:
+    """Forecast for one entry of a batched request"""
+    location = query.get("location")
+    if not location:
+        return {"error": "location is required", "forecast": []}
+    return get_weather_forecast(location, int(query.get("days") or 7))
+
+
 def lambda_handler(event, context):
     """
     AWS Lambda handler for AgentCore Gateway
@@ -110,6 +133,15 @@ def lambda_handler(event, context):
         print(f"Extracted tool name: {tool_name}")
         
         if tool_name == "get_weather_forecast":
+            queries = get_named_parameter(event, "queries")
+            if queries:
+                # Batch of locations: fetch concurrently, report failures per item
+                results = run_batch(_forecast_for_query, queries)
+                return {
+                    "statusCode": 200,
+                    "body": json.dumps({"results": results})
+                }
+            
             location = get_named_parameter(event, "location")
             days = get_named_parameter(event, "days")
             
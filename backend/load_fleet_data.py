@@ -4,10 +4,21 @@ Generate and load mock fleet data into DynamoDB
 Creates realistic vehicle inventory across multiple US cities
 """
 import boto3
-import random
+import functools
+import hashlib
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timedelta
 import uuid
 from decimal import Decimal
+import numpy as np
+from boto3.dynamodb.types import TypeSerializer
+from botocore.config import Config
+from botocore.exceptions import ClientError
+
+from stack_outputs import get_cdk_outputs
 
 # Major US cities with ZIP codes
 CITIES = [
@@ -47,86 +58,187 @@ VEHICLES = [
     {"make": "Volkswagen", "model": "Jetta", "year": 2024, "category": "sedan", "daily_rate": (40, 60)},
 ]
 
+# Struct-of-arrays view of VEHICLES so per-vehicle fields can be gathered with one index array.
+# object dtype keeps the original Python str/int values for the DynamoDB serializer.
+_makes = np.array([v["make"] for v in VEHICLES], dtype=object)
+_models = np.array([v["model"] for v in VEHICLES], dtype=object)
+# Lowercase search keys for make_model-index; display values keep their casing (BMW, RAV4, CR-V)
+_make_keys = np.array([v["make"].lower() for v in VEHICLES], dtype=object)
+_model_keys = np.array([v["model"].lower() for v in VEHICLES], dtype=object)
+_years = np.array([v["year"] for v in VEHICLES], dtype=object)
+_cats = np.array([v["category"] for v in VEHICLES], dtype=object)
+# Rate bounds in integer cents so rates are drawn exactly, with no float rounding
+_rate_lo = np.array([v["daily_rate"][0] * 100 for v in VEHICLES], dtype=np.int64)
+_rate_hi = np.array([v["daily_rate"][1] * 100 for v in VEHICLES], dtype=np.int64)
+
 STATUSES = ["available", "rented", "maintenance"]
 STATUS_WEIGHTS = [0.6, 0.3, 0.1]  # 60% available, 30% rented, 10% maintenance
 
+# NumPy forms built once: rng.choice would otherwise re-validate the weight list on every call
+_STATUSES = np.array(STATUSES, dtype=object)
+_STATUS_P = np.array(STATUS_WEIGHTS, dtype=float)
+
+
+LICENSE_PREFIXES = np.array(['ABC', 'XYZ', 'DEF', 'GHI', 'JKL'])
+VIN_ALPHABET = np.frombuffer(b'ABCDEFGHJKLMNPRSTUVWXYZ0123456789', dtype='S1')
+
 
-def generate_vehicle_data(city, zip_code):
-    """Generate a single vehicle record"""
-    vehicle = random.choice(VEHICLES)
-    status = random.choices(STATUSES, weights=STATUS_WEIGHTS)[0]
+def generate_vehicles_for_zip(city, zip_code, n, rng):
+    """Generate n vehicle records for a ZIP code, drawing all randomness in one batch per field"""
+    vehicle_idx = rng.integers(0, len(_makes), size=n)
+    statuses = _STATUSES[rng.choice(len(_STATUSES), size=n, p=_STATUS_P)]
     
     # Generate realistic mileage
-    mileage = random.randint(5000, 50000)
-    
-    # Generate daily rate within the vehicle's range (use Decimal for DynamoDB)
-    daily_rate = Decimal(str(round(random.uniform(vehicle["daily_rate"][0], vehicle["daily_rate"][1]), 2)))
-    
-    # Generate license plate
-    license_plate = f"{random.choice(['ABC', 'XYZ', 'DEF', 'GHI', 'JKL'])}{random.randint(1000, 9999)}"
-    
-    # Generate VIN
-    vin = f"1{''.join(random.choices('ABCDEFGHJKLMNPRSTUVWXYZ0123456789', k=16))}"
-    
-    # Rental dates if rented
-    rental_start = None
-    rental_end = None
-    if status == "rented":
-        rental_start = (datetime.now() - timedelta(days=random.randint(1, 7))).isoformat()
-        rental_end = (datetime.now() + timedelta(days=random.randint(1, 14))).isoformat()
-    
-    return {
-        "vehicle_id": str(uuid.uuid4()),
-        "make": vehicle["make"],
-        "model": vehicle["model"],
-        "year": vehicle["year"],
-        "category": vehicle["category"],
-        "status": status,
-        "location": f"{city['name']}, {city['state']}",
-        "zip_code": zip_code,
-        "daily_rate": daily_rate,
-        "mileage": mileage,
-        "license_plate": license_plate,
-        "vin": vin,
-        "rental_start": rental_start,
-        "rental_end": rental_end,
-        "last_updated": datetime.now().isoformat(),
-    }
+    mileage = rng.integers(5000, 50001, size=n)
+    
+    # Generate daily rate within each vehicle's range
+    rate_cents = rng.integers(_rate_lo[vehicle_idx], _rate_hi[vehicle_idx] + 1)
+    makes = _makes[vehicle_idx]
+    models = _models[vehicle_idx]
+    make_keys = _make_keys[vehicle_idx]
+    model_keys = _model_keys[vehicle_idx]
+    years = _years[vehicle_idx]
+    categories = _cats[vehicle_idx]
+    
+    # Generate license plates and VINs
+    plate_prefixes = rng.choice(LICENSE_PREFIXES, size=n)
+    plate_numbers = rng.integers(1000, 10000, size=n)
+    vin_chars = VIN_ALPHABET[rng.integers(0, len(VIN_ALPHABET), size=(n, 16))]
+    vins = vin_chars.view('S16').ravel()
+    
+    # Rental offsets (only used for rented vehicles)
+    started_days_ago = rng.integers(1, 8, size=n)
+    ends_in_days = rng.integers(1, 15, size=n)
+    
+    # Version-4 UUIDs from one os.urandom syscall (uuid4's entropy source) instead of one per vehicle
+    id_bytes = np.frombuffer(os.urandom(16 * n), dtype=np.uint8).reshape(n, 16).copy()
+    id_bytes[:, 6] = (id_bytes[:, 6] & 0x0F) | 0x40
+    id_bytes[:, 8] = (id_bytes[:, 8] & 0x3F) | 0x80
+    
+    now = datetime.now()
+    last_updated = now.isoformat()
+    location = f"{city['name']}, {city['state']}"
+    
+    vehicles = []
+    for i in range(n):
+        status = statuses[i]
+        
+        # Rental dates if rented
+        rental_start = None
+        rental_end = None
+        if status == "rented":
+            rental_start = (now - timedelta(days=int(started_days_ago[i]))).isoformat()
+            rental_end = (now + timedelta(days=int(ends_in_days[i]))).isoformat()
+        
+        vehicles.append({
+            "vehicle_id": str(uuid.UUID(bytes=id_bytes[i].tobytes())),
+            "make": makes[i],
+            "model": models[i],
+            "make_key": make_keys[i],
+            "model_key": model_keys[i],
+            "year": years[i],
+            "category": categories[i],
+            "status": status,
+            "location": location,
+            "zip_code": zip_code,
+            "daily_rate": Decimal(int(rate_cents[i])).scaleb(-2),  # Decimal for DynamoDB
+            "mileage": int(mileage[i]),
+            "license_plate": f"{plate_prefixes[i]}{plate_numbers[i]}",
+            "vin": f"1{vins[i].decode()}",
+            "rental_start": rental_start,
+            "rental_end": rental_end,
+            "last_updated": last_updated,
+        })
+    return vehicles
 
 
-def clear_existing_data(table_name):
-    """Clear all existing records from DynamoDB table"""
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
-    
-    print("🗑️  Clearing existing records from DynamoDB...")
+# Batch writes in flight at once. Workers spend their time blocked on the socket with the
+# GIL released, so threads over one shared client scale like an async loop at this size.
+LOAD_WORKERS = int(os.getenv("FLEET_LOAD_WORKERS", "32"))
+CLEAR_SEGMENTS = 8  # parallel Scan segments used to wipe the table
+
+# One pooled connection per worker (default is 10); flush_batch does its own throttle backoff
+_CLIENT_CONFIG = Config(max_pool_connections=max(LOAD_WORKERS, CLEAR_SEGMENTS), tcp_keepalive=True)
+
+
+@functools.lru_cache(maxsize=None)
+def _client(name):
+    """One boto3 client per service for the whole script (low-level clients are thread-safe)"""
+    return boto3.client(name, config=_CLIENT_CONFIG)
+
+
+THROTTLE_CODES = ("ProvisionedThroughputExceededException", "ThrottlingException")
+BATCH_WRITE_LIMIT = 25  # BatchWriteItem maximum
+MAX_BATCH_ATTEMPTS = 8
+
+_serializer = TypeSerializer()
+
+
+def flush_batch(client, table_name, requests):
+    """
+    Send write requests with BatchWriteItem in 25-item chunks.
     
-    # Scan and delete all items
+    UnprocessedItems (partial throttling) are resent with exponential backoff
+    instead of being dropped; raises if a chunk still has leftovers after
+    MAX_BATCH_ATTEMPTS.
+    """
+    for start in range(0, len(requests), BATCH_WRITE_LIMIT):
+        pending = {table_name: requests[start:start + BATCH_WRITE_LIMIT]}
+        for attempt in range(MAX_BATCH_ATTEMPTS):
+            try:
+                pending = client.batch_write_item(RequestItems=pending).get('UnprocessedItems')
+            except ClientError as e:
+                if e.response["Error"]["Code"] not in THROTTLE_CODES:
+                    raise
+            if not pending:
+                break
+            time.sleep(min(2 ** attempt * 0.05, 2.0))
+        else:
+            raise RuntimeError(f"BatchWriteItem left items unprocessed after {MAX_BATCH_ATTEMPTS} attempts")
+
+
+def put_requests(items):
+    """PutRequest entries with each item serialized to DynamoDB JSON once"""
+    return [
+        {'PutRequest': {'Item': {k: _serializer.serialize(v) for k, v in item.items()}}}
+        for item in items
+    ]
+
+
+def clear_segment(client, table_name, segment):
+    """Scan one segment for keys and batch-delete them, returning the count"""
     scan_kwargs = {
-        'ProjectionExpression': 'vehicle_id'
+        'TableName': table_name,
+        'ProjectionExpression': 'vehicle_id',
+        'Segment': segment,
+        'TotalSegments': CLEAR_SEGMENTS,
     }
-    
     deleted_count = 0
+    while True:
+        response = client.scan(**scan_kwargs)
+        keys = response.get('Items', [])
+        if keys:
+            flush_batch(client, table_name, [{'DeleteRequest': {'Key': key}} for key in keys])
+            deleted_count += len(keys)
+        
+        # Check if there are more items to scan
+        if 'LastEvaluatedKey' not in response:
+            return deleted_count
+        scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def clear_existing_data(table_name):
+    """Clear all existing records from DynamoDB table"""
+    print("🗑️  Clearing existing records from DynamoDB...")
     
     try:
-        while True:
-            response = table.scan(**scan_kwargs)
-            items = response.get('Items', [])
-            
-            if not items:
-                break
-            
-            # Batch delete items
-            with table.batch_writer() as batch:
-                for item in items:
-                    batch.delete_item(Key={'vehicle_id': item['vehicle_id']})
-                    deleted_count += 1
-            
-            # Check if there are more items to scan
-            if 'LastEvaluatedKey' not in response:
-                break
-            
-            scan_kwargs['ExclusiveStartKey'] = response['LastEvaluatedKey']
+        # Each segment is an independent scan + delete on the shared client
+        client = _client('dynamodb')
+        with ThreadPoolExecutor(max_workers=CLEAR_SEGMENTS) as executor:
+            deleted_count = sum(executor.map(
+                lambda segment: clear_segment(client, table_name, segment),
+                range(CLEAR_SEGMENTS),
+            ))
         
         if deleted_count > 0:
             print(f"✅ Deleted {deleted_count} existing records")
@@ -136,38 +248,112 @@ def clear_existing_data(table_name):
         print(f"⚠️  Error clearing data: {e}")
 
 
-def load_data_to_dynamodb(table_name, batch_size=25):
-    """Generate and load mock data into DynamoDB"""
-    dynamodb = boto3.resource('dynamodb')
-    table = dynamodb.Table(table_name)
+# Fixed seed so a given config always produces the same fleet mix; override with FLEET_DATA_SEED
+SEED = int(os.getenv("FLEET_DATA_SEED", "42"))
+
+# Records which config the table was last loaded from. Kept in SSM, not the fleet table,
+# so table readers (including the frontend's full scan) only ever see vehicles.
+# destroy_all.sh deletes it with the other /hertz/agentcore parameters.
+CHECKSUM_PARAMETER = "/hertz/agentcore/fleet_data_checksum"
+
+
+# Bump when the attributes written per vehicle change, so existing tables are reloaded
+ITEM_SCHEMA_VERSION = 2
+
+
+def config_checksum():
+    """Hash of everything that determines the generated fleet"""
+    config = (CITIES, VEHICLES, STATUSES, STATUS_WEIGHTS, SEED, ITEM_SCHEMA_VERSION)
+    return hashlib.sha256(repr(config).encode()).hexdigest()
+
+
+def _load_marker(table_name, checksum):
+    """Checksum tied to this table instance, so a re-created table is always reloaded"""
+    created = _client('dynamodb').describe_table(TableName=table_name)['Table']['CreationDateTime']
+    return f"{checksum}:{table_name}:{created.isoformat()}"
+
+
+def is_loaded(table_name, checksum):
+    """True when the last successful load into this table used the same config"""
+    try:
+        stored = _client('ssm').get_parameter(Name=CHECKSUM_PARAMETER)['Parameter']['Value']
+        return stored == _load_marker(table_name, checksum)
+    except Exception as e:
+        # ParameterNotFound on first run; anything else just means a full reload
+        print(f"ℹ️  No previous load recorded: {e}")
+        return False
+
+
+def save_checksum(table_name, checksum):
+    _client('ssm').put_parameter(
+        Name=CHECKSUM_PARAMETER,
+        Value=_load_marker(table_name, checksum),
+        Type='String',
+        Overwrite=True,
+        Description='Fleet data config checksum of the last load (load_fleet_data.py)',
+    )
+
+
+class BatchAccumulator:
+    """
+    Buffer write requests across ZIP codes and submit each full 25-item batch
+    to the executor, so no BatchWriteItem goes out under-filled except the last.
+    """
+    
+    def __init__(self, executor, client, table_name):
+        self.executor = executor
+        self.client = client
+        self.table_name = table_name
+        self.buffer = []
+        self.futures = []
     
+    def add(self, request):
+        self.buffer.append(request)
+        if len(self.buffer) == BATCH_WRITE_LIMIT:
+            self._submit()
+    
+    def _submit(self):
+        self.futures.append(self.executor.submit(flush_batch, self.client, self.table_name, self.buffer))
+        self.buffer = []
+    
+    def close(self):
+        """Submit the remainder and wait for every batch, re-raising the first failure"""
+        if self.buffer:
+            self._submit()
+        for future in as_completed(self.futures):
+            future.result()
+        return len(self.futures)
+
+
+def load_data_to_dynamodb(table_name):
+    """Generate and load mock data into DynamoDB"""
     print(f"\n🚗 Generating mock fleet data for {len(CITIES)} cities...")
     
+    rng = np.random.default_rng(SEED)
+    client = _client('dynamodb')
     total_vehicles = 0
+    city_totals = {}
+    with ThreadPoolExecutor(max_workers=LOAD_WORKERS) as executor:
+        batches = BatchAccumulator(executor, client, table_name)
+        for city in CITIES:
+            for zip_code in city['zip_codes']:
+                # Generate 15-30 vehicles per ZIP code
+                num_vehicles = int(rng.integers(15, 31))
+                vehicles = generate_vehicles_for_zip(city, zip_code, num_vehicles, rng)
+                for request in put_requests(vehicles):
+                    batches.add(request)
+                total_vehicles += num_vehicles
+                city_totals[city['name']] = city_totals.get(city['name'], 0) + num_vehicles
+                print(f"   ✅ {city['name']}, {city['state']} {zip_code}: {num_vehicles} vehicles")
+        batch_count = batches.close()
     
-    for city in CITIES:
-        print(f"\n📍 {city['name']}, {city['state']}")
-        
-        for zip_code in city['zip_codes']:
-            # Generate 15-30 vehicles per ZIP code
-            num_vehicles = random.randint(15, 30)
-            vehicles = [generate_vehicle_data(city, zip_code) for _ in range(num_vehicles)]
-            
-            # Batch write to DynamoDB
-            with table.batch_writer() as batch:
-                for vehicle in vehicles:
-                    batch.put_item(Item=vehicle)
-            
-            total_vehicles += num_vehicles
-            print(f"   ✅ {zip_code}: {num_vehicles} vehicles")
-    
-    print(f"\n✅ Successfully loaded {total_vehicles} vehicles across {len(CITIES)} cities")
+    print(f"\n✅ Successfully loaded {total_vehicles} vehicles across {len(CITIES)} cities "
+          f"in {batch_count} batch writes")
     
     # Print summary by city
     print("\n📊 Summary by City:")
     for city in CITIES:
-        city_vehicles = sum([random.randint(15, 30) for _ in city['zip_codes']])
-        print(f"   {city['name']}, {city['state']}: ~{len(city['zip_codes']) * 22} vehicles")
+        print(f"   {city['name']}, {city['state']}: {city_totals.get(city['name'], 0)} vehicles")
 
 
 def main():
@@ -177,9 +363,7 @@ def main():
     
     # Get table name from CloudFormation
     try:
-        cfn = boto3.client('cloudformation')
-        stack = cfn.describe_stacks(StackName='HertzMcpStack')
-        outputs = {o['OutputKey']: o['OutputValue'] for o in stack['Stacks'][0]['Outputs']}
+        outputs = get_cdk_outputs('HertzMcpStack', _client('cloudformation'))
         table_name = outputs.get('FleetTableName', 'hertz-fleet-inventory')
     except Exception as e:
         print(f"⚠️  Could not get table name from CloudFormation: {e}")
@@ -187,11 +371,19 @@ def main():
     
     print(f"📦 Target Table: {table_name}\n")
     
+    # Skip the clear + reload when the table already holds this exact config
+    checksum = config_checksum()
+    if "--force" not in sys.argv and is_loaded(table_name, checksum):
+        print(f"✅ Table already loaded with this fleet config ({checksum[:12]}), nothing to do")
+        print("   Run with --force to regenerate anyway")
+        return
+    
     # Clear existing data first
     clear_existing_data(table_name)
     
     # Load new data
     load_data_to_dynamodb(table_name)
+    save_checksum(table_name, checksum)
     
     print("\n✅ Data loading complete!")
     print("\n🎯 Next Steps:")
@@ -0,0 +1,38 @@
+"""
+CDK stack outputs shared by the deploy scripts
+deploy_all.sh writes them with `cdk deploy --outputs-file`; a stack missing from
+the file is described once via CloudFormation and cached alongside
+"""
+import json
+import os
+
+OUTPUTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".hertz_cdk_outputs.json")
+
+
+def _load():
+    try:
+        with open(OUTPUTS_FILE, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def get_cdk_outputs(stack_name: str, cfn=None) -> dict:
+    """Return {OutputKey: OutputValue} for a stack, from the local cache when present"""
+    cached = _load()
+    if cached.get(stack_name):
+        return cached[stack_name]
+
+    if cfn is None:
+        import boto3
+        cfn = boto3.client("cloudformation")
+    stack = cfn.describe_stacks(StackName=stack_name)
+    outputs = {o["OutputKey"]: o["OutputValue"] for o in stack["Stacks"][0].get("Outputs", [])}
+
+    cached[stack_name] = outputs
+    try:
+        with open(OUTPUTS_FILE, "w") as f:
+            json.dump(cached, f, indent=2)
+    except OSError as e:
+        print(f"⚠️  Could not cache stack outputs: {e}")
+    return outputs
@@ -2,7 +2,12 @@
 Strands Agent Runtime for Amazon Bedrock AgentCore
 This file defines the agent that will run in AgentCore Runtime
 """
+import asyncio
+import functools
+import hashlib
 import os
+import threading
+from collections import OrderedDict
 from bedrock_agentcore.runtime import BedrockAgentCoreApp
 from strands import Agent
 from strands.tools.mcp import MCPClient
@@ -21,25 +26,41 @@ from fleet_tools import (
 )
 
 
-def get_ssm_parameter(name: str) -> str:
-    """Retrieve parameter from AWS Systems Manager Parameter Store"""
-    ssm = boto3.client('ssm')
-    try:
-        response = ssm.get_parameter(Name=name, WithDecryption=True)
-        return response['Parameter']['Value']
-    except Exception as e:
-        print(f"⚠️  Could not retrieve parameter {name}: {e}")
-        return None
-
-
 # Initialize the AgentCore app
 app = BedrockAgentCoreApp()
 
 # Get configuration from environment
 region = os.getenv("AWS_REGION", "us-east-1")
-current_date = datetime.now().strftime("%B %d, %Y")
 
-system_prompt = f"""You are an AI assistant for Hertz fleet management and demand prediction.
+# Clients are created once per process and reused by every invocation
+ssm_client = boto3.client('ssm', region_name=region)
+gateway_client = boto3.client("bedrock-agentcore-control", region_name=region)
+
+
+# Failures raise out of the cached functions, so they are retried on the next call
+@functools.lru_cache(maxsize=32)
+def _read_ssm_parameter(name: str) -> str:
+    response = ssm_client.get_parameter(Name=name, WithDecryption=True)
+    return response['Parameter']['Value']
+
+
+@functools.lru_cache(maxsize=1)
+def _resolve_gateway_url() -> str:
+    gateway_id = _read_ssm_parameter("/hertz/agentcore/gateway_id")
+    return gateway_client.get_gateway(gatewayIdentifier=gateway_id)["gatewayUrl"]
+
+
+def get_gateway_url() -> str:
+    """Gateway URL, resolved once per process (the gateway does not move between deploys)"""
+    try:
+        return _resolve_gateway_url()
+    except Exception as e:
+        print(f"⚠️  Gateway not available: {e}")
+        return None
+
+
+# Prompt body is built once; only the date token changes, so the rendered prompt is cached per day
+SYSTEM_PROMPT_TEMPLATE = """You are an AI assistant for Hertz fleet management and demand prediction.
 
 CURRENT DATE: {current_date}
 
@@ -118,6 +139,17 @@ DEMAND IMPACT CATEGORIES:
 
 Be conversational, insightful, and ALWAYS connect every answer back to fleet demand implications. Think like a fleet operations manager who needs to make data-driven decisions about vehicle positioning, pricing, and availability."""
 
+
+@functools.lru_cache(maxsize=2)
+def _render_system_prompt(current_date: str) -> str:
+    return SYSTEM_PROMPT_TEMPLATE.replace("{current_date}", current_date)
+
+
+def get_system_prompt() -> str:
+    """System prompt with today's date (previously frozen at import time)"""
+    return _render_system_prompt(datetime.now().strftime("%B %d, %Y"))
+
+
 # Initialize the model
 model = BedrockModel(
     model_id="anthropic.claude-3-haiku-20240307-v1:0",
@@ -136,6 +168,100 @@ local_tools = [
 
 print(f"✅ Runtime initialized with {len(local_tools)} local tools")
 
+# Started MCP sessions and their tool lists, keyed by a hash of the Authorization header.
+# Keeping the session open skips the handshake + list_tools round-trip on every request.
+MCP_CACHE_SIZE = 32
+_mcp_cache = OrderedDict()
+_mcp_lock = threading.Lock()
+
+
+class _McpSession:
+    """A started MCPClient shared by every invocation holding a reference to it"""
+
+    def __init__(self, client, tools):
+        self.client = client
+        self.tools = tools
+        self.refs = 0
+        self.retired = False  # out of the cache; stopped once the last holder releases it
+
+
+def _auth_key(auth_header: str) -> str:
+    return hashlib.sha256(auth_header.encode()).hexdigest()
+
+
+def _stop_client(mcp_client):
+    try:
+        mcp_client.stop(None, None, None)
+    except Exception as e:
+        print(f"⚠️  Error closing MCP client: {e}")
+
+
+def _retire(session) -> list:
+    """Mark a session dropped from the cache; returns its client if nobody is using it (lock held)"""
+    session.retired = True
+    return [session.client] if session.refs == 0 else []
+
+
+def acquire_mcp_session(gateway_url: str, auth_header: str) -> _McpSession:
+    """MCP session for this caller, opened on first use; pair with release_mcp_session"""
+    key = _auth_key(auth_header)
+    with _mcp_lock:
+        session = _mcp_cache.get(key)
+        if session:
+            _mcp_cache.move_to_end(key)
+            session.refs += 1
+            return session
+
+    mcp_client = MCPClient(
+        lambda: streamablehttp_client(
+            url=gateway_url, headers={"Authorization": auth_header}
+        )
+    )
+    mcp_client.start()
+    try:
+        mcp_tools = mcp_client.list_tools_sync()
+    except Exception:
+        _stop_client(mcp_client)
+        raise
+
+    to_stop = []
+    with _mcp_lock:
+        session = _mcp_cache.get(key)
+        if session:
+            # Another request won the race; use its session and drop ours (never shared)
+            to_stop.append(mcp_client)
+        else:
+            session = _mcp_cache[key] = _McpSession(mcp_client, mcp_tools)
+            while len(_mcp_cache) > MCP_CACHE_SIZE:
+                to_stop += _retire(_mcp_cache.popitem(last=False)[1])
+        session.refs += 1
+    for client in to_stop:
+        _stop_client(client)
+    return session
+
+
+def release_mcp_session(session: _McpSession):
+    """Drop this invocation's reference; a retired session is stopped by its last holder"""
+    with _mcp_lock:
+        session.refs -= 1
+        stop = session.retired and session.refs == 0
+    if stop:
+        _stop_client(session.client)
+
+
+def evict_mcp_session(auth_header: str, session: _McpSession = None):
+    """Drop a cached session (expired token, broken connection) without cutting off other holders"""
+    key = _auth_key(auth_header)
+    to_stop = []
+    with _mcp_lock:
+        cached = _mcp_cache.get(key)
+        # Only evict the session that failed, not a fresh one opened since
+        if cached and (session is None or cached is session):
+            del _mcp_cache[key]
+            to_stop = _retire(cached)
+    for client in to_stop:
+        _stop_client(client)
+
 
 @app.entrypoint
 async def invoke(payload, context=None):
@@ -146,51 +272,43 @@ async def invoke(payload, context=None):
     request_headers = context.request_headers or {}
     auth_header = request_headers.get("Authorization", "")
     
-    # Try to get Gateway ID from SSM (optional for SigV4 auth)
-    existing_gateway_id = get_ssm_parameter("/hertz/agentcore/gateway_id")
+    # Gateway URL is cached after the first lookup (optional for SigV4 auth)
+    gateway_url = get_gateway_url() if auth_header else None
     
     # Try to use MCP tools if gateway is available
     tools = local_tools
-    if existing_gateway_id and auth_header:
+    session = None
+    if gateway_url:
         try:
-            # Get gateway URL
-            gateway_client = boto3.client("bedrock-agentcore-control", region_name=region)
-            gateway_response = gateway_client.get_gateway(gatewayIdentifier=existing_gateway_id)
-            gateway_url = gateway_response["gatewayUrl"]
-            
-            # Create MCP client with JWT token
-            mcp_client = MCPClient(
-                lambda: streamablehttp_client(
-                    url=gateway_url, headers={"Authorization": auth_header}
-                )
-            )
-            
-            with mcp_client:
-                mcp_tools = mcp_client.list_tools_sync()
-                tools = local_tools + mcp_tools
-                print(f"✅ Using {len(local_tools)} local tools + {len(mcp_tools)} MCP tools")
+            # Reuse the cached MCP session for this JWT token
+            # Session start + list_tools block, so keep them off the event loop
+            session = await asyncio.to_thread(acquire_mcp_session, gateway_url, auth_header)
+            tools = local_tools + session.tools
+            print(f"✅ Using {len(local_tools)} local tools + {len(session.tools)} MCP tools")
         except Exception as e:
             print(f"⚠️  MCP client unavailable, using local tools only: {str(e)}")
+            evict_mcp_session(auth_header)
             tools = local_tools
     else:
         print(f"ℹ️  No gateway/auth header, using {len(local_tools)} local tools only")
     
-    # Create agent with available tools
+    # Agent holds conversation state, so it stays per-request; only the MCP session is shared
     try:
         agent = Agent(
-            model=model, tools=tools, system_prompt=system_prompt
+            model=model, tools=tools, system_prompt=get_system_prompt()
         )
         
         # Invoke agent
-        response = agent(user_input)
+        response = await agent.invoke_async(user_input)
         return response.message["content"][0]["text"]
     except Exception as e:
         print(f"Agent error: {str(e)}")
+        if session and ("401" in str(e) or "Unauthorized" in str(e)):
+            evict_mcp_session(auth_header, session)
         return f"Error: {str(e)}"
-
-
-if __name__ == "__main__":
-    app.run()
+    finally:
+        if session:
+            release_mcp_session(session)
 
 
 if __name__ == "__main__":
@@ -38,8 +38,35 @@ echo "━━━━━━━━━━━━━━━━━━━━━━━━
 cd backend/cdk
 echo "📦 Installing CDK dependencies..."
 pip install -q -r requirements.txt
+
+# DynamoDB takes one GSI create/delete per update, so an existing fleet table is
+# stepped through the index stages it hasn't reached (see FLEET_INDEX_STAGES)
+FLEET_INDEX_STAGES=$(python -c "from hertz_mcp_stack import FLEET_INDEX_STAGES; print(FLEET_INDEX_STAGES)")
+if aws cloudformation describe-stacks --stack-name HertzMcpStack > /dev/null 2>&1; then
+    CURRENT_INDEX_STAGE=$(aws cloudformation describe-stacks --stack-name HertzMcpStack --query "Stacks[0].Outputs[?OutputKey=='FleetIndexStage'].OutputValue" --output text)
+    # Stacks deployed before the staged rollout have no output: stage 0
+    if [ -z "$CURRENT_INDEX_STAGE" ] || [ "$CURRENT_INDEX_STAGE" == "None" ]; then
+        CURRENT_INDEX_STAGE=0
+    fi
+    for ((stage = CURRENT_INDEX_STAGE + 1; stage < FLEET_INDEX_STAGES; stage++)); do
+        echo "📇 Rolling out fleet table index stage $stage/$FLEET_INDEX_STAGES..."
+        cdk deploy HertzMcpStack --require-approval never -c fleet_index_stage=$stage
+    done
+fi
+
+# Pin the HTTP API's CORS origin to the CloudFront URL (api_gateway_stack.py reads
+# REACT_APP_ORIGIN); the first deploy has no frontend yet and keeps the "*" fallback
+if [ -z "$REACT_APP_ORIGIN" ] && aws cloudformation describe-stacks --stack-name HertzFrontendStack > /dev/null 2>&1; then
+    FRONTEND_ORIGIN=$(aws cloudformation describe-stacks --stack-name HertzFrontendStack --query "Stacks[0].Outputs[?OutputKey=='CloudFrontURL'].OutputValue" --output text)
+    if [ -n "$FRONTEND_ORIGIN" ] && [ "$FRONTEND_ORIGIN" != "None" ]; then
+        export REACT_APP_ORIGIN="$FRONTEND_ORIGIN"
+        echo "🔒 Restricting API CORS to $REACT_APP_ORIGIN"
+    fi
+fi
+
 echo "🚀 Deploying HertzMcpStack and HertzApiGatewayStack..."
-cdk deploy --all --require-approval never
+# Outputs are saved for deploy_gateway.py / deploy_agentcore_runtime.py (see stack_outputs.py)
+cdk deploy --all --require-approval never --outputs-file ../.hertz_cdk_outputs.json
 if [ $? -ne 0 ]; then
     echo "❌ CDK deployment failed"
     exit 1
@@ -177,6 +204,16 @@ if [ ! -z "$API_GATEWAY_URL" ]; then
     fi
 fi
 
+# Runtime ARN lets the browser invoke AgentCore directly via the Identity Pool role
+if [ ! -z "$RUNTIME_ARN" ]; then
+    echo "   Setting REACT_APP_RUNTIME_ARN=$RUNTIME_ARN"
+    if grep -q "^REACT_APP_RUNTIME_ARN=" "$FRONTEND_ENV"; then
+        sed -i.bak "s|^REACT_APP_RUNTIME_ARN=.*|REACT_APP_RUNTIME_ARN=$RUNTIME_ARN|" "$FRONTEND_ENV"
+    else
+        echo "REACT_APP_RUNTIME_ARN=$RUNTIME_ARN" >> "$FRONTEND_ENV"
+    fi
+fi
+
 # Update Cognito configuration
 if [ ! -z "$COGNITO_USER_POOL_ID" ]; then
     echo "   Setting REACT_APP_COGNITO_USER_POOL_ID=$COGNITO_USER_POOL_ID"
@@ -246,22 +283,14 @@ if [ $? -ne 0 ]; then
     exit 1
 fi
 
-# Get CloudFront distribution details
-BUCKET_NAME=$(aws cloudformation describe-stacks --stack-name HertzFrontendStack --query "Stacks[0].Outputs[?OutputKey=='BucketName'].OutputValue" --output text)
-DISTRIBUTION_ID=$(aws cloudformation describe-stacks --stack-name HertzFrontendStack --query "Stacks[0].Outputs[?OutputKey=='DistributionId'].OutputValue" --output text)
+# The stack uploads build/ with Cache-Control headers and invalidates index.html itself
 CLOUDFRONT_URL=$(aws cloudformation describe-stacks --stack-name HertzFrontendStack --query "Stacks[0].Outputs[?OutputKey=='CloudFrontURL'].OutputValue" --output text)
 
-# Upload build files to S3
-echo "📤 Uploading build files to S3..."
-cd ..
-aws s3 sync build/ s3://$BUCKET_NAME/ --delete
-
-# Invalidate CloudFront cache
-echo "🔄 Invalidating CloudFront cache..."
-aws cloudfront create-invalidation --distribution-id $DISTRIBUTION_ID --paths "/*"
-
 echo "✅ Frontend deployed successfully"
-cd ../..
+if [ -z "$REACT_APP_ORIGIN" ]; then
+    echo "   ℹ️  API CORS allows any origin until the next ./deploy_all.sh pins it to $CLOUDFRONT_URL"
+fi
+cd ../../..
 
 # Get the latest runtime ARN for display
 DEPLOYED_RUNTIME_ARN=$(aws ssm get-parameter --name "/hertz/agentcore/strands_runtime_arn" --query "Parameter.Value" --output text 2>/dev/null || echo "")
@@ -294,28 +323,15 @@ echo "   - .env (backend)"
 echo "   - frontend/react-app/.env (frontend)"
 echo "   - AWS SSM Parameter Store"
 echo ""
-echo "⚠️  MANUAL ACTION REQUIRED:"
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "🔧 Update Lambda Runtime ARN:"
-echo ""
-echo "   Run this command to update the Lambda function with the new runtime ARN:"
-echo ""
+echo "🔗 Runtime ARN (read by hertz-runtime-proxy from SSM, cached for 5 minutes):"
 if [ ! -z "$DEPLOYED_RUNTIME_ARN" ]; then
-    echo "   aws lambda update-function-configuration \\"
-    echo "     --function-name hertz-runtime-proxy \\"
-    echo "     --environment Variables=\"{STRANDS_RUNTIME_ARN=$DEPLOYED_RUNTIME_ARN,COGNITO_USER_POOL_ID=$COGNITO_USER_POOL_ID,COGNITO_CLIENT_ID=$COGNITO_CLIENT_ID,COGNITO_TEST_USERNAME=${COGNITO_TEST_USERNAME:-test-user},COGNITO_TEST_PASSWORD=${COGNITO_TEST_PASSWORD:-TestPass123!},TICKETMASTER_API_KEY=${TICKETMASTER_API_KEY:-},AVIATIONSTACK_API_KEY=${AVIATIONSTACK_API_KEY:-}}\""
-    echo ""
-    echo "   Or copy this ARN to update manually in AWS Console:"
     echo "   $DEPLOYED_RUNTIME_ARN"
 else
     echo "   ⚠️  Could not retrieve runtime ARN from SSM"
 fi
 echo ""
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo ""
 echo "🎯 Next Steps:"
-echo "   1. Update the Lambda function with the command above"
-echo "   2. Open the frontend URL in your browser"
-echo "   3. Sign in with the test credentials"
-echo "   4. Start chatting with the AI agent!"
+echo "   1. Open the frontend URL in your browser"
+echo "   2. Sign in with the test credentials"
+echo "   3. Start chatting with the AI agent!"
 echo ""
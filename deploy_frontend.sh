@@ -19,9 +19,13 @@ cd frontend/react-app
 
 # Step 1: Install dependencies (if needed)
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "Step 1/4: Installing dependencies"
+echo "Step 1/3: Installing dependencies"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-if [ ! -d "node_modules" ]; then
+# Reinstall when package.json/package-lock.json changed since the last install
+# (npm records the installed tree in node_modules/.package-lock.json)
+if [ ! -f "node_modules/.package-lock.json" ] || \
+   [ package.json -nt node_modules/.package-lock.json ] || \
+   [ package-lock.json -nt node_modules/.package-lock.json ]; then
     echo "📦 Installing npm packages..."
     npm install
 else
@@ -31,54 +35,23 @@ echo ""
 
 # Step 2: Build React app
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "Step 2/4: Building React app"
+echo "Step 2/3: Building React app"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 echo "🔨 Building production bundle..."
 npm run build
 echo "✅ Build complete"
 echo ""
 
-# Step 3: Get S3 bucket and CloudFront distribution from CDK outputs
+# Step 3: Deploy the stack; it uploads build/ with Cache-Control headers and invalidates index.html
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "Step 3/4: Uploading to S3"
+echo "Step 3/3: Deploying to S3 + CloudFront"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-
-# Get bucket name from CDK stack
 cd cdk
-BUCKET_NAME=$(aws cloudformation describe-stacks \
-    --stack-name HertzFrontendStack \
-    --query "Stacks[0].Outputs[?OutputKey=='BucketName'].OutputValue" \
-    --output text)
-
-DISTRIBUTION_ID=$(aws cloudformation describe-stacks \
-    --stack-name HertzFrontendStack \
-    --query "Stacks[0].Outputs[?OutputKey=='DistributionId'].OutputValue" \
-    --output text)
-
-cd ..
-
-if [ -z "$BUCKET_NAME" ]; then
-    echo "❌ Could not find S3 bucket. Make sure HertzFrontendStack is deployed."
-    exit 1
-fi
-
-echo "📤 Uploading to S3 bucket: $BUCKET_NAME"
-aws s3 sync build/ s3://$BUCKET_NAME/ --delete
+pip install -q -r requirements.txt
+cdk deploy --require-approval never
 echo "✅ Upload complete"
 echo ""
-
-# Step 4: Invalidate CloudFront cache
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-echo "Step 4/4: Invalidating CloudFront cache"
-echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
-
-if [ -z "$DISTRIBUTION_ID" ]; then
-    echo "⚠️  Could not find CloudFront distribution ID. Skipping cache invalidation."
-else
-    echo "🔄 Invalidating CloudFront distribution: $DISTRIBUTION_ID"
-    aws cloudfront create-invalidation --distribution-id $DISTRIBUTION_ID --paths "/*"
-    echo "✅ Cache invalidation initiated"
-fi
+cd ..
 
 cd ../..
 
@@ -89,6 +62,5 @@ echo "╚═══════════════════════
 echo ""
 echo "🌐 Your frontend is now live!"
 echo ""
-echo "📝 Note: CloudFront cache invalidation may take a few minutes to propagate."
-echo "    If you don't see changes immediately, wait 2-3 minutes and refresh."
+echo "📝 Note: index.html is served with no-cache; hashed bundles are cached for a year."
 echo ""
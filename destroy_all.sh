@@ -80,8 +80,9 @@ echo "━━━━━━━━━━━━━━━━━━━━━━━━
 echo "Step 3/5: Deleting AgentCore Gateway"
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
 
-# Get gateway ID from SSM
-GATEWAY_ID=$(aws ssm get-parameter --name "/hertz/agentcore/weather_gateway_id" --query "Parameter.Value" --output text || echo "")
+# Get gateway ID from SSM (weather_gateway_id is the name used by older deployments)
+GATEWAY_ID=$(aws ssm get-parameter --name "/hertz/agentcore/gateway_id" --query "Parameter.Value" --output text 2>/dev/null || \
+    aws ssm get-parameter --name "/hertz/agentcore/weather_gateway_id" --query "Parameter.Value" --output text || echo "")
 
 if [ ! -z "$GATEWAY_ID" ]; then
     echo "🗑️  Deleting gateway: $GATEWAY_ID"
@@ -151,6 +152,7 @@ SSM_PARAMS=(
     "/hertz/agentcore/weather_lambda_arn"
     "/hertz/agentcore/flight_lambda_arn"
     "/hertz/agentcore/test_access_token"
+    "/hertz/agentcore/fleet_data_checksum"
 )
 
 echo "🗑️  Deleting SSM parameters..."
@@ -160,6 +162,11 @@ done
 
 echo "✅ SSM parameters cleaned up"
 
+# The stack only schedules the secret for deletion; purge it so the fixed
+# name is free for the next deploy
+aws secretsmanager delete-secret --secret-id "hertz/external-api-keys" --force-delete-without-recovery > /dev/null \
+    && echo "✅ API key secret purged" || echo "⚠️  API key secret not found"
+
 # Step 7: Clean up local files
 echo ""
 echo "━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━"
@@ -168,6 +175,7 @@ echo "━━━━━━━━━━━━━━━━━━━━━━━━
 
 # Clean up CDK outputs
 rm -rf backend/cdk/cdk.out
+rm -f backend/.hertz_cdk_outputs.json
 rm -rf frontend/react-app/cdk/cdk.out
 
 # Clean up Docker artifacts from runtime deployment
@@ -1,13 +1,20 @@
+import os
+
 from aws_cdk import (
     Stack,
     aws_s3 as s3,
+    aws_s3_deployment as s3deploy,
     aws_cloudfront as cloudfront,
     aws_cloudfront_origins as origins,
     CfnOutput,
+    Duration,
     RemovalPolicy,
 )
 from constructs import Construct
 
+# React production build (npm run build), deployed by the stack itself
+BUILD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "build")
+
 class FrontendStack(Stack):
     def __init__(self, scope: Construct, construct_id: str, **kwargs) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -22,28 +29,20 @@ class FrontendStack(Stack):
             auto_delete_objects=True,
         )
 
-        # Origin Access Identity for CloudFront
-        oai = cloudfront.OriginAccessIdentity(
-            self,
-            "OAI",
-            comment="OAI for Hertz Frontend"
-        )
-        
-        # Grant CloudFront access to S3
-        website_bucket.grant_read(oai)
-
         # CloudFront distribution
         distribution = cloudfront.Distribution(
             self,
             "HertzFrontendDistribution",
             default_behavior=cloudfront.BehaviorOptions(
-                origin=origins.S3Origin(
-                    website_bucket,
-                    origin_access_identity=oai
-                ),
+                # Origin Access Control (SigV4); CDK adds the OAC and the bucket policy grant
+                origin=origins.S3BucketOrigin.with_origin_access_control(website_bucket),
                 viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
                 cache_policy=cloudfront.CachePolicy.CACHING_OPTIMIZED,
+                # Brotli/gzip negotiated per Accept-Encoding (CACHING_OPTIMIZED keys on both)
+                compress=True,
             ),
+            http_version=cloudfront.HttpVersion.HTTP2_AND_3,
+            enable_ipv6=True,
             default_root_object="index.html",
             error_responses=[
                 cloudfront.ErrorResponse(
@@ -59,6 +58,39 @@ class FrontendStack(Stack):
             ],
         )
 
+        # Hashed bundles under static/ never change content, so browsers and edges keep them for a year
+        static_assets = s3deploy.BucketDeployment(
+            self,
+            "DeployStaticAssets",
+            sources=[s3deploy.Source.asset(os.path.join(BUILD_DIR, "static"))],
+            destination_bucket=website_bucket,
+            destination_key_prefix="static/",
+            cache_control=[
+                s3deploy.CacheControl.set_public(),
+                s3deploy.CacheControl.max_age(Duration.days(365)),
+                s3deploy.CacheControl.immutable(),
+            ],
+            memory_limit=512,
+        )
+
+        # index.html and the other unhashed files revalidate on every load so new bundles are picked up
+        app_shell = s3deploy.BucketDeployment(
+            self,
+            "DeployAppShell",
+            sources=[s3deploy.Source.asset(BUILD_DIR, exclude=["static/*"])],
+            destination_bucket=website_bucket,
+            exclude=["static/*"],
+            cache_control=[
+                s3deploy.CacheControl.no_cache(),
+                s3deploy.CacheControl.max_age(Duration.seconds(0)),
+            ],
+            distribution=distribution,
+            distribution_paths=["/index.html"],
+            memory_limit=512,
+        )
+        # Publish the bundles before the index.html that references them
+        app_shell.node.add_dependency(static_assets)
+
         # Outputs
         CfnOutput(
             self,
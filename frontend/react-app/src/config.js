@@ -1,5 +1,6 @@
 export const config = {
   runtimeEndpoint: process.env.REACT_APP_RUNTIME_ENDPOINT || '',
+  runtimeArn: process.env.REACT_APP_RUNTIME_ARN || '',
   cognito: {
     region: process.env.REACT_APP_AWS_REGION || 'us-east-1',
     userPoolId: process.env.REACT_APP_COGNITO_USER_POOL_ID || '',
@@ -1,6 +1,7 @@
 import axios from 'axios';
 import { fetchAuthSession } from 'aws-amplify/auth';
 import { config } from '../config';
+import { sendChatMessage as sendDirectChatMessage } from './runtimeApi';
 
 const getAuthToken = async () => {
   try {
@@ -16,7 +17,29 @@ const getAuthToken = async () => {
   }
 };
 
+// Pull a vehicles array out of the response text if the agent embedded JSON
+const withVehicles = (data) => {
+  if (data.response) {
+    try {
+      const jsonMatch = data.response.match(/\{[\s\S]*"vehicles"[\s\S]*\}/);
+      if (jsonMatch) {
+        const parsed = JSON.parse(jsonMatch[0]);
+        return { ...data, vehicles: parsed.vehicles };
+      }
+    } catch (e) {
+      // Not JSON, return as is
+    }
+  }
+  return data;
+};
+
 export const sendChatMessage = async (message) => {
+  // With a runtime ARN configured the browser invokes AgentCore directly
+  // through the Identity Pool role; the API Gateway proxy is the fallback
+  if (config.runtimeArn) {
+    return withVehicles(await sendDirectChatMessage(message));
+  }
+
   try {
     const token = await getAuthToken();
     
@@ -33,24 +56,8 @@ export const sendChatMessage = async (message) => {
       }
     );
     
-    // The FastAPI wrapper returns {response: "text", session_id: "..."}
-    // Try to extract JSON from the response text if it contains vehicle data
-    const data = response.data;
-    
-    if (data.response) {
-      // Try to parse JSON from the response text
-      try {
-        const jsonMatch = data.response.match(/\{[\s\S]*"vehicles"[\s\S]*\}/);
-        if (jsonMatch) {
-          const parsed = JSON.parse(jsonMatch[0]);
-          return { ...data, vehicles: parsed.vehicles };
-        }
-      } catch (e) {
-        // Not JSON, return as is
-      }
-    }
-    
-    return data;
+    // The proxy returns {response: "text"}; extract vehicle data if present
+    return withVehicles(response.data);
   } catch (error) {
     console.error('Error sending chat message:', error);
     if (error.response) {
@@ -1,74 +1,59 @@
-import { BedrockAgentCoreControlClient, InvokeAgentRuntimeCommand } from '@aws-sdk/client-bedrock-agentcore-control';
+import { BedrockAgentCoreClient, InvokeAgentRuntimeCommand } from '@aws-sdk/client-bedrock-agentcore';
 import { fromCognitoIdentityPool } from '@aws-sdk/credential-providers';
 import { fetchAuthSession } from 'aws-amplify/auth';
 import { config } from '../config';
 
-// Runtime configuration
-const RUNTIME_ID = 'hertz_strands_runtime-JUlxGW9FAs';
-const ENDPOINT_NAME = 'DEFAULT';
+// One runtime session per browser tab keeps follow-up turns on the same
+// warm runtime instance (session IDs must be at least 33 characters)
+const SESSION_ID = `hertz-web-${crypto.randomUUID()}`;
+
+// Client is reused across messages; the credential provider caches the
+// Identity Pool credentials until they expire
+let client = null;
+let clientIdToken = null;
 
 /**
- * Get AWS credentials from Cognito
+ * Get a data-plane client signed with Cognito Identity Pool credentials
  */
-const getAwsCredentials = async () => {
-  try {
-    const session = await fetchAuthSession();
-    const idToken = session.tokens.idToken.toString();
-    
-    // Create credentials from Cognito Identity Pool
-    // Note: You'll need to create an Identity Pool and configure it
+const getRuntimeClient = async () => {
+  const session = await fetchAuthSession();
+  const idToken = session.tokens?.idToken?.toString();
+  if (!idToken) {
+    throw new Error('No ID token available');
+  }
+
+  if (!client || clientIdToken !== idToken) {
     const credentials = fromCognitoIdentityPool({
       clientConfig: { region: config.region },
-      identityPoolId: config.cognito.identityPoolId, // You'll need to add this
+      identityPoolId: config.cognito.identityPoolId,
       logins: {
         [`cognito-idp.${config.region}.amazonaws.com/${config.cognito.userPoolId}`]: idToken,
       },
     });
-    
-    return credentials;
-  } catch (error) {
-    console.error('Error getting AWS credentials:', error);
-    throw error;
+    client = new BedrockAgentCoreClient({ region: config.region, credentials });
+    clientIdToken = idToken;
   }
+  return client;
 };
 
 /**
- * Invoke AgentCore Runtime directly using AWS SDK
+ * Invoke AgentCore Runtime directly (SigV4), skipping API Gateway and the proxy Lambda
  */
 export const invokeAgentRuntime = async (prompt) => {
+  const runtimeClient = await getRuntimeClient();
+
+  const response = await runtimeClient.send(new InvokeAgentRuntimeCommand({
+    agentRuntimeArn: config.runtimeArn,
+    runtimeSessionId: SESSION_ID,
+    payload: new TextEncoder().encode(JSON.stringify({ prompt })),
+  }));
+
+  const text = await response.response.transformToString();
   try {
-    // Get credentials
-    const credentials = await getAwsCredentials();
-    
-    // Create client
-    const client = new BedrockAgentCoreControlClient({
-      region: config.region,
-      credentials,
-    });
-    
-    // Prepare command
-    const command = new InvokeAgentRuntimeCommand({
-      agentRuntimeId: RUNTIME_ID,
-      endpointName: ENDPOINT_NAME,
-      inputText: JSON.stringify({ prompt }),
-    });
-    
-    // Invoke runtime
-    const response = await client.send(command);
-    
-    // Parse response
-    if (response.outputText) {
-      return response.outputText;
-    } else if (response.body) {
-      // Handle streaming response
-      const decoder = new TextDecoder();
-      return decoder.decode(response.body);
-    } else {
-      return JSON.stringify(response);
-    }
-  } catch (error) {
-    console.error('Error invoking runtime:', error);
-    throw error;
+    const data = JSON.parse(text);
+    return typeof data === 'string' ? data : (data.response ?? JSON.stringify(data));
+  } catch (e) {
+    return text;
   }
 };
 
@@ -78,7 +63,7 @@ export const invokeAgentRuntime = async (prompt) => {
 export const sendChatMessage = async (message) => {
   try {
     const response = await invokeAgentRuntime(message);
-    
+
     // Clean up response
     let responseText = response.trim();
     if ((responseText.startsWith('"') && responseText.endsWith('"')) ||
@@ -86,7 +71,7 @@ export const sendChatMessage = async (message) => {
       responseText = responseText.slice(1, -1);
     }
     responseText = responseText.replace(/\\n/g, '\n');
-    
+
     return { response: responseText };
   } catch (error) {
     console.error('Error sending chat message:', error);